@@ -0,0 +1,77 @@
+"""Поля ответов API и выбор их подмножества параметром `?fields=`.
+
+Каждое поле знает, какие колонки ему нужны, поэтому queryset читает
+только колонки запрошенных полей и присоединяет только нужные таблицы.
+"""
+from collections import namedtuple
+
+Field = namedtuple('Field', ['columns', 'value'])
+
+
+class BadFields(ValueError):
+    pass
+
+
+class Fields:
+    """Набор полей ответа для одной модели."""
+
+    def __init__(self, always=(), **fields):
+        # always — колонки, без которых не работает курсор страницы.
+        self.always = always
+        self.fields = fields
+
+    def names(self, param):
+        """Поля из `?fields=a,b`; без параметра — все."""
+        if not param:
+            return list(self.fields)
+        names = [name for name in param.split(',') if name]
+        unknown = set(names) - set(self.fields)
+        if unknown:
+            raise BadFields(', '.join(sorted(unknown)))
+        return names
+
+    def prepare(self, queryset, names):
+        columns = [*self.always]
+        for name in names:
+            columns.extend(self.fields[name].columns)
+        relations = {column.rpartition('__')[0] for column in columns
+                     if '__' in column}
+        return queryset.select_related(*relations).only(*columns)
+
+    def dump(self, obj, names):
+        return {name: self.fields[name].value(obj) for name in names}
+
+
+def _author(post):
+    author = post.author
+    return {'username': author.username, 'name': author.get_full_name()}
+
+
+def _group(post):
+    group = post.group
+    return group and {'slug': group.slug, 'title': group.title}
+
+
+POST_FIELDS = Fields(
+    always=('pub_date',),
+    id=Field((), lambda post: post.pk),
+    text=Field(('text',), lambda post: post.text),
+    pub_date=Field(('pub_date',), lambda post: post.pub_date),
+    updated=Field(('updated',), lambda post: post.updated),
+    author=Field(
+        ('author__username', 'author__first_name', 'author__last_name'),
+        _author),
+    group=Field(('group__slug', 'group__title'), _group),
+    image=Field(('image',),
+                lambda post: post.image.url if post.image else None),
+    thumbnails=Field(('thumbnails',), lambda post: post.thumbnail_urls),
+)
+
+COMMENT_FIELDS = Fields(
+    always=('created',),
+    id=Field((), lambda comment: comment.pk),
+    text=Field(('text',), lambda comment: comment.text),
+    created=Field(('created',), lambda comment: comment.created),
+    author=Field(('author__username',),
+                 lambda comment: comment.author.username),
+)
@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import counters
+from posts.archive import archive_batch
+from posts.models import Comment, Follow, Group, Post
+from posts.tests.utils import forged_cursor
+
+from ..views import PER_PAGE
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(PER_PAGE + 5)
+        )
+        counters.recount_groups()
+        cls.post = Post.objects.latest('pk')
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_list_is_paginated_by_cursor(self):
+        response = self.client.get(reverse('api:post_list'))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertEqual(len(data['results']), PER_PAGE)
+        self.assertIsNone(data['previous'])
+        first = data['results'][0]
+        self.assertEqual(first['id'], self.post.pk)
+        self.assertEqual(first['author'],
+                         {'username': 'author', 'name': 'Лев Толстой'})
+        self.assertEqual(first['group'],
+                         {'slug': 'group', 'title': 'Группа'})
+        second = self.client.get(data['next']).json()
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+
+    def test_forged_cursor(self):
+        """Подделанный курсор даёт первую страницу."""
+        first = self.client.get(reverse('api:post_list')).json()
+        for values in (['notadate', 'x'], [None, 1]):
+            cursor = forged_cursor(values)
+            with self.subTest(values=values):
+                response = self.client.get(reverse('api:post_list'),
+                                           {'after': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['results'],
+                                 first['results'])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только нужные поля и колонки."""
+        url = reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        with self.assertNumQueries(2):
+            # Проверка ETag и сам пост, без присоединения авторов и групп.
+            data = self.client.get(url, {'fields': 'id,text'}).json()
+        self.assertEqual(data, {'id': self.post.pk, 'text': self.post.text})
+        response = self.client.get(url, {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_returns_not_modified(self):
+        url = reverse('api:profile_posts', kwargs={'username': 'author'})
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_comments_groups_and_profile(self):
+        comments = self.client.get(reverse(
+            'api:post_comments', kwargs={'post_id': self.post.pk})).json()
+        self.assertEqual(comments['results'][0]['author'], 'reader')
+        groups = self.client.get(reverse('api:group_list')).json()
+        self.assertEqual(groups['results'][0]['posts_count'], PER_PAGE + 5)
+        profile = self.client.get(reverse(
+            'api:profile_detail', kwargs={'username': 'author'})).json()
+        self.assertEqual(profile['followers_count'], 1)
+        missing = self.client.get(reverse(
+            'api:group_detail', kwargs={'slug': 'missing'}))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_archived_post_is_served(self):
+        archive_batch([self.post.pk])
+        kwargs = {'post_id': self.post.pk}
+        response = self.client.get(reverse('api:post_detail', kwargs=kwargs))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['text'], self.post.text)
+        self.assertTrue(response.has_header('ETag'))
+        comments = self.client.get(reverse(
+            'api:post_comments', kwargs=kwargs)).json()
+        self.assertEqual(comments['results'][0]['author'], 'reader')
+        missing = self.client.get(reverse(
+            'api:post_detail', kwargs={'post_id': self.post.pk + 1}))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_lists_include_archived_posts(self):
+        """Профиль и группа после свежих постов листают архивные."""
+        ids = list(Post.objects.order_by('-pk').values_list('pk', flat=True))
+        archive_batch(ids[-3:])
+        urls = (reverse('api:profile_posts', kwargs={'username': 'author'}),
+                reverse('api:group_posts', kwargs={'slug': 'group'}))
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(f'{url}?fields=id').json()
+                second = self.client.get(first['next']).json()
+                self.assertEqual(
+                    [post['id'] for post in first['results']
+                     + second['results']],
+                    ids,
+                )
+
+    def test_follow_feed(self):
+        self.assertEqual(
+            self.client.get(reverse('api:follow')).status_code, 401)
+        self.client.force_login(self.reader)
+        data = self.client.get(reverse('api:follow')).json()
+        self.assertEqual(data['results'][0]['id'], self.post.pk)
@@ -0,0 +1,189 @@
+"""JSON API только для чтения: посты, группы, профили, комментарии.
+
+Ответы собираются из словарей и сразу сериализуются, без шаблонов.
+Списки листаются курсорами `?after=`/`?before=` (ссылки `next` и
+`previous` в ответе), а `?fields=id,text` оставляет в постах и
+комментариях только нужные поля. ETag те же, что у HTML-страниц
+(`posts.conditional`): неизменившийся ответ отдаётся как 304.
+Пост и его комментарии, как и на странице поста, ищутся и в архиве
+(posts/archive.py).
+"""
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_safe
+
+from core.db.routers import read_from_primary
+from posts import conditional
+from posts.cache import cached_cursor_page
+from posts.counters import get_stats
+from posts.feed import get_feed
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Group,
+                          Post, User)
+from posts.paginators import CursorPaginator, MergedCursorPaginator
+
+from .fields import COMMENT_FIELDS, POST_FIELDS, BadFields
+
+PER_PAGE = 20
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data, status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def _error(status, detail):
+    return _json({'detail': detail}, status=status)
+
+
+def _link(request, **params):
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query.update(params)
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def _page(request, queryset, fields, cache_scope=None, archived=None):
+    """Курсорная страница объектов queryset в формате ответа API.
+
+    С `archived` после свежих объектов листаются архивные.
+    """
+    try:
+        names = fields.names(request.GET.get('fields'))
+    except BadFields as error:
+        return _error(400, f'Неизвестные поля: {error}')
+    queryset = fields.prepare(queryset, names)
+    if archived is None:
+        paginator = CursorPaginator(queryset, PER_PAGE)
+    else:
+        paginator = MergedCursorPaginator(
+            [queryset, fields.prepare(archived, names)], PER_PAGE)
+    cursors = {'after': request.GET.get('after'),
+               'before': request.GET.get('before')}
+    if cache_scope:
+        page = cached_cursor_page(f'api:{cache_scope}:{",".join(names)}',
+                                  paginator, **cursors)
+    else:
+        page = paginator.get_page(**cursors)
+    return _json({
+        'results': [fields.dump(obj, names) for obj in page],
+        'next': paginator.next_cursor and _link(
+            request, after=paginator.next_cursor),
+        'previous': paginator.previous_cursor and _link(
+            request, before=paginator.previous_cursor),
+    })
+
+
+def _group(group):
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+        'posts_count': group.posts_count,
+    }
+
+
+@require_safe
+@condition(etag_func=conditional.posts_etag)
+def post_list(request):
+    return _page(request, Post.objects.all(), POST_FIELDS, 'index')
+
+
+@require_safe
+@condition(etag_func=conditional.post_detail_etag,
+           last_modified_func=conditional.post_detail_last_modified)
+def post_detail(request, post_id):
+    try:
+        names = POST_FIELDS.names(request.GET.get('fields'))
+    except BadFields as error:
+        return _error(400, f'Неизвестные поля: {error}')
+    for model in (Post, ArchivedPost):
+        post = POST_FIELDS.prepare(model.objects.filter(pk=post_id),
+                                   names).first()
+        if post is not None:
+            break
+    else:
+        return _error(404, 'Пост не найден')
+    return _json(POST_FIELDS.dump(post, names))
+
+
+@require_safe
+@condition(etag_func=conditional.post_detail_etag,
+           last_modified_func=conditional.post_detail_last_modified)
+def post_comments(request, post_id):
+    if Post.objects.filter(pk=post_id).exists():
+        comments = Comment.objects.filter(post_id=post_id)
+    elif ArchivedPost.objects.filter(pk=post_id).exists():
+        comments = ArchivedComment.objects.filter(post_id=post_id)
+    else:
+        return _error(404, 'Пост не найден')
+    return _page(request, comments, COMMENT_FIELDS)
+
+
+@require_safe
+@condition(etag_func=conditional.posts_etag)
+def group_list(request):
+    # ETag — только версия кэша страниц, поэтому читаем основную базу:
+    # с отставшей реплики под новым ETag ушёл бы старый список.
+    with read_from_primary():
+        groups = list(Group.objects.order_by('title'))
+    return _json({'results': [_group(group) for group in groups]})
+
+
+@require_safe
+@condition(etag_func=conditional.group_etag)
+def group_detail(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return _error(404, 'Группа не найдена')
+    return _json(_group(group))
+
+
+@require_safe
+@condition(etag_func=conditional.group_etag)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).only('pk').first()
+    if group is None:
+        return _error(404, 'Группа не найдена')
+    return _page(request, group.posts.all(), POST_FIELDS,
+                 f'group:{group.pk}', archived=group.archived_posts.all())
+
+
+@require_safe
+@condition(etag_func=conditional.profile_etag)
+def profile_detail(request, username):
+    author = User.objects.select_related('stats').filter(
+        username=username).first()
+    if author is None:
+        return _error(404, 'Автор не найден')
+    stats = get_stats(author)
+    return _json({
+        'username': author.username,
+        'name': author.get_full_name(),
+        'posts_count': stats.posts_count,
+        'comments_count': stats.comments_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+        'following': (
+            request.user.is_authenticated
+            and author.following.filter(user=request.user).exists()
+        ),
+    })
+
+
+@require_safe
+@condition(etag_func=conditional.profile_etag)
+def profile_posts(request, username):
+    author = User.objects.filter(username=username).only('pk').first()
+    if author is None:
+        return _error(404, 'Автор не найден')
+    return _page(request, author.posts.all(), POST_FIELDS,
+                 f'profile:{author.pk}', archived=author.archived_posts.all())
+
+
+@require_safe
+def follow_feed(request):
+    if not request.user.is_authenticated:
+        return _error(401, 'Нужно войти')
+    return _page(request, get_feed(request.user), POST_FIELDS)
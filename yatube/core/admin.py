@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'key',
+        'status',
+        'attempts',
+        'created',
+        'finished',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Job, JobAdmin)
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import auth, signals  # noqa: F401
+
+        if settings.TEMPLATES_WARM_UP:
+            from .template_cache import warm_up
+            warm_up()
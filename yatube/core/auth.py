@@ -0,0 +1,55 @@
+"""Пользователь запроса из кэша.
+
+`AuthenticationMiddleware` на каждый запрос достаёт пользователя по id
+из сессии. `CachedModelBackend` держит его в кэше, а сигналы
+(core/signals.py) удаляют запись при сохранении и удалении пользователя,
+в том числе при смене пароля и входе (обновляется `last_login`).
+Изменения через `QuerySet.update()` сигналов не шлют и видны только
+через `AUTH_USER_CACHE_TIMEOUT`.
+
+Кэш должен быть общим для всех процессов сервера, иначе процесс, не
+видевший сохранения, до конца таймаута будет пускать по старому паролю.
+Поэтому в settings_production кэш — memcached, а `check --deploy`
+предупреждает (core.W001) о бэкенде с кэшем в памяти процесса.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core import checks
+from django.core.cache import cache
+
+BACKEND = 'core.auth.CachedModelBackend'
+LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def forget_user(user_id):
+    cache.delete(user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if (settings.DEBUG or BACKEND not in settings.AUTHENTICATION_BACKENDS
+            or backend != LOCAL_CACHE):
+        return []
+    return [checks.Warning(
+        'CachedModelBackend с кэшем в памяти процесса: смена пароля и '
+        'блокировка не видны другим процессам сервера',
+        hint='Укажите в CACHES общий кэш, например memcached',
+        id='core.W001',
+    )]
@@ -0,0 +1,100 @@
+"""SQLite для нагруженного сайта.
+
+Поверх стандартного бэкенда:
+
+* при подключении выполняются PRAGMA из `OPTIONS['pragmas']` —
+  WAL, `synchronous=NORMAL`, mmap, размер кэша и `busy_timeout`;
+* транзакции начинаются с `BEGIN IMMEDIATE`, чтобы блокировка записи
+  бралась сразу, а не при первой записи, когда SQLite уже не может
+  подождать и отвечает «database is locked»;
+* с `OPTIONS['serialize_writes']` транзакции процесса выстраиваются
+  в очередь на общей блокировке, и SQLite не приходится разбирать
+  одновременные попытки записи из разных потоков.
+
+Пример настроек:
+
+    DATABASES = {'default': {
+        'ENGINE': 'core.db.backends.sqlite3',
+        'NAME': 'db.sqlite3',
+        'OPTIONS': {
+            'pragmas': {'journal_mode': 'wal', 'busy_timeout': 5000},
+            'serialize_writes': True,
+        },
+    }}
+"""
+import threading
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+# Параметры OPTIONS, которые не передаются в sqlite3.connect().
+OWN_OPTIONS = ('pragmas', 'serialize_writes', 'write_timeout')
+
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def get_write_lock(name):
+    """Блокировка записи, общая для всех потоков процесса и одной базы."""
+    with _write_locks_guard:
+        return _write_locks.setdefault(name, threading.Lock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._holds_write_lock = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in OWN_OPTIONS:
+            params.pop(option, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self._acquire_write_lock()
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _acquire_write_lock(self):
+        options = self.settings_dict['OPTIONS']
+        if not options.get('serialize_writes') or self._holds_write_lock:
+            return
+        lock = get_write_lock(self.settings_dict['NAME'])
+        if not lock.acquire(timeout=options.get('write_timeout', 30)):
+            raise OperationalError('database is locked: очередь записи')
+        self._holds_write_lock = True
+
+    def _release_write_lock(self):
+        if self._holds_write_lock:
+            self._holds_write_lock = False
+            get_write_lock(self.settings_dict['NAME']).release()
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self._release_write_lock()
@@ -0,0 +1,92 @@
+"""Чтение с реплик, запись в основную базу.
+
+`ReplicaRouter` отправляет все записи в `default`, а чтения — в одну из
+реплик `DATABASE_REPLICAS`, но только внутри безопасных (GET, HEAD)
+запросов, которые пропустил `ReplicaMiddleware`. Фоновые потоки,
+команды и сигналы вне запроса читают из основной базы: реплика может
+ещё не знать о только что записанном.
+
+После запроса с записью (POST и другие небезопасные методы) middleware
+ставит cookie, и `REPLICA_PIN_SECONDS` секунд запросы этого
+пользователя тоже читают из основной базы: иначе после редиректа он
+мог бы не увидеть свой пост или комментарий, пока их не получила
+реплика.
+
+То, что кладётся в общий кэш страниц, читается из основной базы
+(`read_from_primary`), иначе отставшая реплика попала бы в кэш
+надолго.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_local = threading.local()
+
+
+def replica_for_reads():
+    """Реплика, выбранная для текущего запроса, или None."""
+    return getattr(_local, 'replica', None)
+
+
+@contextmanager
+def read_from_primary():
+    """Читать из основной базы и внутри запроса, выбравшего реплику.
+
+    Так читают всё, что попадёт в общий кэш: после записи версия кэша
+    страниц меняется сразу, а реплика может отставать, и её устаревшая
+    страница сохранилась бы под новой версией.
+    """
+    replica = replica_for_reads()
+    _local.replica = None
+    try:
+        yield
+    finally:
+        _local.replica = replica
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replica = replica_for_reads()
+        # Внутри транзакции читаем то, что в ней записано.
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему вместе с данными (sync_replicas).
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        if (safe and settings.DATABASE_REPLICAS
+                and PIN_COOKIE not in request.COOKIES):
+            _local.replica = random.choice(settings.DATABASE_REPLICAS)
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.replica = None
+        if not safe and settings.DATABASE_REPLICAS:
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
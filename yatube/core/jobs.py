@@ -0,0 +1,189 @@
+"""Очередь фоновых задач в таблице базы.
+
+Функция-задача помечается декоратором `@task`, а ставится в очередь
+вызовом `enqueue(задача, *аргументы, key=...)`. Строка `Job` пишется
+в той же транзакции, что и данные, ради которых задача поставлена:
+если транзакция откатится, задачи не будет, а зафиксированную её
+обязательно подберёт воркер (`manage.py run_worker`).
+
+* Аргументы хранятся в JSON, поэтому задачам передают id, а не объекты.
+* `key` убирает повторы: пока в очереди ждёт задача с тем же ключом,
+  вторая не добавляется.
+* Упавшая задача повторяется через `JOBS_RETRY_DELAY` секунд, с каждой
+  попыткой вдвое позже, а после `max_attempts` попыток остаётся
+  в состоянии «не выполнена» с текстом ошибки.
+* Задачу, которая выполняется дольше `JOBS_TIMEOUT` (воркер упал),
+  подберёт другой воркер, если попытки не кончились; иначе она
+  становится «не выполнена»: задача, которая роняет воркер, не должна
+  подбираться вечно.
+
+При `JOBS_EAGER` задача выполняется сразу при постановке, в текущем
+процессе: так удобнее при разработке и в тестах.
+"""
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+from .profiling import percentile
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+WORKER_DIED = 'Воркер упал, не закончив задачу'
+
+
+def task(function=None, *, max_attempts=None):
+    """Зарегистрировать функцию как задачу очереди."""
+    def register(function):
+        function.task_name = f'{function.__module__}.{function.__name__}'
+        function.max_attempts = max_attempts
+        _tasks[function.task_name] = function
+        return function
+    return register(function) if function else register
+
+
+def get_task(name):
+    """Задача по имени; модуль импортируется, если ещё не загружен."""
+    if name not in _tasks:
+        import_module(name.rpartition('.')[0])
+    return _tasks[name]
+
+
+def enqueue(function, *args, key=None, delay=0):
+    """Поставить задачу в очередь; с ключом — если такой ещё не ждёт."""
+    if settings.JOBS_EAGER:
+        try:
+            function(*args)
+        except Exception:
+            logger.exception('Задача %s%r не выполнена',
+                             function.task_name, args)
+        return
+    job = Job(
+        name=function.task_name,
+        payload=json.dumps(args),
+        key=key,
+        max_attempts=function.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+    # Повтор по ключу нарушает частичный уникальный индекс и пропускается.
+    Job.objects.bulk_create([job], ignore_conflicts=True)
+
+
+def claim():
+    """Взять ближайшую готовую задачу или None, если их нет."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_TIMEOUT)
+    ready = Q(status=Job.QUEUED, run_after__lte=now) | Q(
+        status=Job.RUNNING, started__lt=stale,
+        attempts__lt=F('max_attempts'))
+    with transaction.atomic():
+        Job.objects.filter(
+            status=Job.RUNNING, started__lt=stale,
+            attempts__gte=F('max_attempts'),
+        ).update(status=Job.FAILED, finished=now, error=WORKER_DIED)
+        job = (Job.objects.select_for_update(skip_locked=True)
+               .filter(ready).order_by('run_after', 'pk').first())
+        if job is None:
+            return None
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, started=now, attempts=F('attempts') + 1)
+    job.status, job.started, job.attempts = (
+        Job.RUNNING, now, job.attempts + 1)
+    return job
+
+
+def _retry(job, error):
+    delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, error=error,
+                run_after=timezone.now() + timedelta(seconds=delay))
+    except IntegrityError:
+        # Такая же задача уже ждёт в очереди и сделает ту же работу.
+        Job.objects.filter(pk=job.pk).delete()
+
+
+def execute(job):
+    """Выполнить взятую задачу и записать результат."""
+    try:
+        get_task(job.name)(*json.loads(job.payload))
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s не выполнена', job)
+        if job.attempts < job.max_attempts:
+            _retry(job, error)
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, error=error, finished=timezone.now())
+        return False
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.DONE, finished=timezone.now())
+    return True
+
+
+def purge():
+    """Удалить выполненные задачи старше JOBS_KEEP_DONE секунд."""
+    before = timezone.now() - timedelta(seconds=settings.JOBS_KEEP_DONE)
+    Job.objects.filter(status=Job.DONE, finished__lt=before).delete()
+
+
+def work(burst=False, stop=None):
+    """Цикл воркера: брать и выполнять задачи, пока не попросят остановиться.
+
+    С `burst` цикл заканчивается, когда готовых задач не осталось.
+    Возвращает число выполненных задач.
+    """
+    done = 0
+    while stop is None or not stop.is_set():
+        job = claim()
+        if job is None:
+            if burst:
+                break
+            purge()
+            time.sleep(settings.JOBS_POLL_INTERVAL)
+            continue
+        execute(job)
+        done += 1
+    return done
+
+
+def stats():
+    """Глубина очереди и задержки задач за последние JOBS_STATS_WINDOW.
+
+    Ожидание — от постановки до начала выполнения последней попытки,
+    выполнение — от её начала до конца; оба в миллисекундах.
+    """
+    now = timezone.now()
+    queued = Job.objects.filter(status=Job.QUEUED)
+    since = now - timedelta(seconds=settings.JOBS_STATS_WINDOW)
+    finished = Job.objects.filter(status=Job.DONE, finished__gte=since)
+    waits, runs = [], []
+    for created, started, ended in finished.values_list(
+            'created', 'started', 'finished'):
+        waits.append((started - created).total_seconds() * 1000)
+        runs.append((ended - started).total_seconds() * 1000)
+    oldest = queued.aggregate(oldest=Min('created'))['oldest']
+    return {
+        'queued': queued.count(),
+        'ready': queued.filter(run_after__lte=now).count(),
+        'running': Job.objects.filter(status=Job.RUNNING).count(),
+        'failed': Job.objects.filter(status=Job.FAILED).count(),
+        'oldest_queued_s': (
+            (now - oldest).total_seconds() if oldest else None),
+        'done': len(runs),
+        'wait_p50_ms': percentile(waits, 50),
+        'wait_p95_ms': percentile(waits, 95),
+        'run_p50_ms': percentile(runs, 50),
+        'run_p95_ms': percentile(runs, 95),
+    }
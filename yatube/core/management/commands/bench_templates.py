@@ -0,0 +1,94 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core.profiling import percentile
+from posts.models import Group, Post, User
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def templates_with(loaders):
+    base = settings.TEMPLATES[0]
+    return [{
+        **base,
+        'APP_DIRS': False,
+        'OPTIONS': {**base['OPTIONS'], 'loaders': loaders},
+    }]
+
+
+# Свой кэш в памяти процесса: cache.clear() в замерах не должен стирать
+# сессии, лимиты и счётчики входа из общего кэша сервера.
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench-templates',
+    }
+}
+
+VARIANTS = {
+    'без кэша': templates_with(LOADERS),
+    'с кэшем': templates_with(
+        [('django.template.loaders.cached.Loader', LOADERS)]),
+}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время рендеринга posts/index.html с 10 постами '
+            'без кэширующего загрузчика шаблонов и с ним')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def context(self):
+        # Посты не из базы: меряется только работа шаблонов.
+        author = User(username='bench', first_name='Имя', last_name='Автор')
+        group = Group(pk=1, title='Группа', slug='group')
+        now = timezone.now()
+        posts = [
+            Post(pk=pk, author=author, group=group, pub_date=now,
+                 updated=now, text='Текст поста ' * 20)
+            for pk in range(1, 11)
+        ]
+        return {'page_obj': Paginator(posts, 10).page(1)}
+
+    def measure(self, context, request, iterations):
+        # Первый рендер прогревает кэш загрузчика, если он есть.
+        render_to_string('posts/index.html', context, request)
+        timings = []
+        for _ in range(iterations):
+            # Карточки постов не должны браться из кэша фрагментов.
+            cache.clear()
+            started = time.perf_counter()
+            render_to_string('posts/index.html', context, request)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        context = self.context()
+        results = {}
+        for name, templates in VARIANTS.items():
+            with override_settings(TEMPLATES=templates,
+                                   CACHES=BENCH_CACHES):
+                timings = self.measure(context, request,
+                                       options['iterations'])
+            results[name] = timings
+            self.stdout.write(
+                f'{name}: p50 {percentile(timings, 50):.2f} мс, '
+                f'p95 {percentile(timings, 95):.2f} мс, '
+                f'среднее {sum(timings) / len(timings):.2f} мс')
+        before, after = (sum(timings) for timings in results.values())
+        self.stdout.write(f'Ускорение: {before / after:.1f}×')
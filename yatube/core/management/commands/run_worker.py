@@ -0,0 +1,56 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def _work(burst, stop):
+    try:
+        jobs.work(burst=burst, stop=stop)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Запускает процессы, выполняющие фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOBS_WORKERS,
+            help='Число процессов-воркеров')
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда готовых задач не останется')
+
+    def handle(self, *args, **options):
+        # Дочерним процессам нельзя делить соединения с родителем.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        handlers = {signum: signal.signal(signum, shutdown)
+                    for signum in (signal.SIGTERM, signal.SIGINT)}
+        workers = [
+            context.Process(target=_work, args=(options['burst'], stop),
+                            name=f'worker-{number}')
+            for number in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Запущено воркеров: {len(workers)}')
+        try:
+            for worker in workers:
+                worker.join()
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        failed = sum(worker.exitcode != 0 for worker in workers)
+        if failed:
+            self.stderr.write(f'Воркеров завершилось с ошибкой: {failed}')
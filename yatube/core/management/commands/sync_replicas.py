@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик: так две копии '
+            'базы на одной машине изображают основную базу и реплику')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='Файлы реплик; по умолчанию — базы DATABASE_REPLICAS')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or [
+            connections[alias].settings_dict['NAME']
+            for alias in settings.DATABASE_REPLICAS
+        ]
+        source = connections[DEFAULT_DB_ALIAS]
+        source.ensure_connection()
+        for path in paths:
+            target = sqlite3.connect(path)
+            try:
+                # Онлайн-копия: запись в основную базу не останавливается.
+                source.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'Реплика обновлена: {path}')
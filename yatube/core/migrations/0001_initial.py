@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='задача')),
+                ('payload', models.TextField(default='[]', verbose_name='аргументы')),
+                ('key', models.CharField(blank=True, help_text='Пока в очереди есть задача с этим ключом, такая же не добавляется', max_length=200, null=True, verbose_name='ключ')),
+                ('status', models.CharField(choices=[('queued', 'в очереди'), ('running', 'выполняется'), ('done', 'выполнена'), ('failed', 'не выполнена')], default='queued', max_length=10, verbose_name='состояние')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(verbose_name='попыток не больше')),
+                ('run_after', models.DateTimeField(verbose_name='выполнить после')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='поставлена')),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='начата')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='закончена')),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'finished'], name='job_status_finished_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(status='queued'), fields=('key',), name='job_queued_key_unique'),
+        ),
+    ]
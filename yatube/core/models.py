@@ -0,0 +1,63 @@
+from django.db import models
+from django.db.models import Q
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди (см. core/jobs.py)."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'в очереди'),
+        (RUNNING, 'выполняется'),
+        (DONE, 'выполнена'),
+        (FAILED, 'не выполнена'),
+    )
+
+    name = models.CharField(max_length=200, verbose_name='задача')
+    payload = models.TextField(default='[]', verbose_name='аргументы')
+    key = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        verbose_name='ключ',
+        help_text='Пока в очереди есть задача с этим ключом, '
+                  'такая же не добавляется',
+    )
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=QUEUED, verbose_name='состояние')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='попыток')
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='попыток не больше')
+    run_after = models.DateTimeField(verbose_name='выполнить после')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='поставлена')
+    started = models.DateTimeField(null=True, blank=True,
+                                   verbose_name='начата')
+    finished = models.DateTimeField(null=True, blank=True,
+                                    verbose_name='закончена')
+    error = models.TextField(blank=True, verbose_name='ошибка')
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['status', 'run_after'],
+                         name='job_status_run_after_idx'),
+            models.Index(fields=['status', 'finished'],
+                         name='job_status_finished_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=Q(status='queued'),
+                name='job_queued_key_unique',
+            ),
+        ]
@@ -0,0 +1,249 @@
+"""Выборочное профилирование запросов.
+
+`ProfilingMiddleware` для доли `PROFILING_SAMPLE_RATE` запросов (и для
+запросов сотрудников с `?_profile`) записывает время ответа, число, время
+и повторы SQL-запросов, попадания и промахи кэша, время рендеринга
+шаблонов и нарезки миниатюр sorl. Результат уходит в заголовок
+`Server-Timing` и в скользящую сводку по представлениям, которую
+показывает `/admin/profiling/`.
+
+Вне выборки запрос стоит одного вызова `random()`: обёртки шаблонов,
+кэша и миниатюр ставятся один раз при запуске и ничего не делают, пока
+в потоке нет активной записи.
+"""
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from functools import wraps
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.cache import caches
+from django.db import connections
+
+_local = threading.local()
+_stats = defaultdict(
+    lambda: deque(maxlen=settings.PROFILING_WINDOW))
+_stats_lock = threading.Lock()
+_installed = False
+
+
+class Record:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.statements = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.in_get_many = False
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.thumbnail_ms = 0.0
+        self.total_ms = 0.0
+
+    @property
+    def duplicates(self):
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.statements[(sql, repr(params))] += 1
+
+    def server_timing(self):
+        # Заголовок передаётся в latin-1, поэтому описания по-английски.
+        return ', '.join((
+            f'total;dur={self.total_ms:.1f}',
+            f'db;dur={self.sql_ms:.1f};desc="{self.queries} queries, '
+            f'{self.duplicates} duplicates"',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'thumb;dur={self.thumbnail_ms:.1f}',
+            f'cache;desc="hit {self.cache_hits}, miss {self.cache_misses}"',
+        ))
+
+    def as_dict(self):
+        return {
+            'total_ms': self.total_ms,
+            'queries': self.queries,
+            'sql_ms': self.sql_ms,
+            'duplicates': self.duplicates,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'template_ms': self.template_ms,
+            'thumbnail_ms': self.thumbnail_ms,
+        }
+
+
+def active():
+    return getattr(_local, 'record', None)
+
+
+def _timed(attribute, outermost=False):
+    """Обёртка, добавляющая время вызова к полю активной записи."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            record = active()
+            if record is None:
+                return method(*args, **kwargs)
+            # Вложенные шаблоны уже учтены во внешнем.
+            if outermost and record.template_depth:
+                return method(*args, **kwargs)
+            record.template_depth += outermost
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record.template_depth -= outermost
+                elapsed = (time.perf_counter() - started) * 1000
+                setattr(record, attribute,
+                        getattr(record, attribute) + elapsed)
+        return wrapper
+    return decorator
+
+
+def _counted_get(method):
+    @wraps(method)
+    def get(self, key, default=None, version=None):
+        value = method(self, key, default, version)
+        record = active()
+        if record is not None and not record.in_get_many:
+            if value is default:
+                record.cache_misses += 1
+            else:
+                record.cache_hits += 1
+        return value
+    return get
+
+
+def _counted_get_many(method):
+    @wraps(method)
+    def get_many(self, keys, version=None):
+        record = active()
+        if record is None or record.in_get_many:
+            return method(self, keys, version)
+        keys = list(keys)
+        # Базовый get_many сам вызывает get: не считаем ключи дважды.
+        record.in_get_many = True
+        try:
+            values = method(self, keys, version)
+        finally:
+            record.in_get_many = False
+        record.cache_hits += len(values)
+        record.cache_misses += len(keys) - len(values)
+        return values
+    return get_many
+
+
+def install():
+    """Поставить обёртки шаблонов, кэша и миниатюр (один раз)."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from django.template.base import Template
+    Template.render = _timed('template_ms', outermost=True)(Template.render)
+
+    from sorl.thumbnail.base import ThumbnailBackend
+    ThumbnailBackend.get_thumbnail = _timed('thumbnail_ms')(
+        ThumbnailBackend.get_thumbnail)
+
+    for cache_class in {type(caches[alias]) for alias in settings.CACHES}:
+        cache_class.get = _counted_get(cache_class.get)
+        cache_class.get_many = _counted_get_many(cache_class.get_many)
+
+
+def record_stats(view_name, record):
+    with _stats_lock:
+        _stats[view_name].append(record.as_dict())
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга; для пустого списка — None."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+def summary():
+    """Сводка по представлениям: средние и перцентили времени ответа."""
+    with _stats_lock:
+        snapshot = {name: list(rows) for name, rows in _stats.items()}
+    result = []
+    for name, rows in sorted(snapshot.items()):
+        totals = [row['total_ms'] for row in rows]
+        averages = {
+            field: sum(row[field] for row in rows) / len(rows)
+            for field in rows[0] if field != 'total_ms'
+        }
+        lookups = averages['cache_hits'] + averages['cache_misses']
+        result.append({
+            'view': name,
+            'samples': len(rows),
+            'p50_ms': percentile(totals, 50),
+            'p95_ms': percentile(totals, 95),
+            'cache_hit_rate': (
+                averages['cache_hits'] / lookups if lookups else None),
+            **averages,
+        })
+    return result
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _is_staff(request):
+    """Сотрудник ли автор запроса.
+
+    Middleware стоит раньше сессий и аутентификации, поэтому сессия
+    и пользователь читаются здесь сами, только для запросов с ?_profile.
+    """
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore(
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    return get_user(SimpleNamespace(session=session)).is_staff
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        requested = '_profile' in request.GET and _is_staff(request)
+        if (not requested
+                and random.random() >= settings.PROFILING_SAMPLE_RATE):
+            return self.get_response(request)
+        record = _local.record = Record()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(record.execute))
+                response = self.get_response(request)
+        finally:
+            _local.record = None
+        record.total_ms = (time.perf_counter() - started) * 1000
+        response['Server-Timing'] = record.server_timing()
+        match = request.resolver_match
+        record_stats(match.view_name if match else request.path_info,
+                     record)
+        return response
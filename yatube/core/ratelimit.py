@@ -0,0 +1,159 @@
+"""Ограничение частоты запросов к представлениям.
+
+Лимиты задаются строками вида `'10/m'`: не больше 10 запросов в минуту
+(периоды s, m, h, d). `RATE_LIMITS` ограничивает каждого пользователя,
+`RATE_LIMITS_IP` — все запросы с одного IP, в том числе от разных
+пользователей; гостей ограничивает только лимит на IP.
+
+Считает скользящее окно: к запросам текущего периода прибавляется доля
+запросов прошлого, пропорциональная ещё не ушедшей его части. Поэтому
+на стыке периодов нельзя сделать вдвое больше лимита, как с окном,
+которое обнуляется в начале периода. Счётчики периодов лежат в кэше
+`RATE_LIMIT_CACHE`.
+
+Счётчики всех корзин запроса, текущего и прошлого периодов, читаются
+одним `get_many()`, и отклонённый запрос на этом заканчивается.
+Пропущенный затем тратит токены: по `incr()` на корзину (у гостя одна,
+у пользователя две), первый запрос периода ещё и `add()`. Итого одно
+обращение к кэшу на отказ и два-три на пропущенный запрос. Меньше не
+выйдет: API кэша Django не увеличивает несколько ключей за раз.
+
+Превысившие лимит получают 429 с заголовком `Retry-After`.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60)."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def client_keys(request):
+    """Пары (словарь лимитов, ключ корзины), которые тратит запрос."""
+    keys = [(settings.RATE_LIMITS_IP, f'ip:{request.META.get("REMOTE_ADDR")}')]
+    if request.user.is_authenticated:
+        keys.insert(0, (settings.RATE_LIMITS, f'user:{request.user.pk}'))
+    return keys
+
+
+def _key(scope, ident, window):
+    return f'ratelimit:{scope}:{ident}:{window}'
+
+
+def _wait(spent, previous, elapsed, limit, period):
+    """Через сколько секунд снова уложиться в лимит без новых запросов.
+
+    spent — запросы текущего периода вместе с отклонённым.
+    """
+    if spent <= limit:
+        # Ждём, пока уйдёт нужная доля прошлого периода.
+        return period * (1 - (limit - spent) / previous) - elapsed
+    # Текущего периода самого по себе много: ждём и в следующем.
+    spent -= 1
+    return period - elapsed + period * (1 - (limit - 1) / spent)
+
+
+def _retry_after(previous, spent, elapsed, limit, period):
+    """0, если spent запросов укладываются в окно, иначе Retry-After."""
+    if previous * (1 - elapsed / period) + spent <= limit:
+        return 0
+    return max(math.ceil(_wait(spent, previous, elapsed, limit, period)), 1)
+
+
+def _incr(cache, key, period):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Первый запрос периода. Если ключ успел добавить соседний
+        # процесс, add() вернёт False и токен спишется incr().
+        # Ключ живёт два периода: следующий читает его как прошлый.
+        if cache.add(key, 1, timeout=2 * period + 1):
+            return 1
+        return cache.incr(key)
+
+
+def take_tokens(scope, buckets, now=None):
+    """Потратить по токену из корзин [(ключ, лимит, период)].
+
+    Вернуть 0 или через сколько секунд повторить. Токены тратятся,
+    только если их хватает во всех корзинах.
+    """
+    now = time.time() if now is None else now
+    cache = caches[settings.RATE_LIMIT_CACHE]
+    windows = []
+    for ident, limit, period in buckets:
+        window = int(now // period)
+        windows.append((_key(scope, ident, window),
+                        _key(scope, ident, window - 1),
+                        limit, period, now - window * period))
+    counts = cache.get_many(
+        [key for current, previous, *_ in windows
+         for key in (current, previous)])
+    waits = [
+        _retry_after(counts.get(previous, 0), counts.get(current, 0) + 1,
+                     elapsed, limit, period)
+        for current, previous, limit, period, elapsed in windows
+    ]
+    if any(waits):
+        return max(waits)
+    taken = []
+    for current, previous, limit, period, elapsed in windows:
+        spent = _incr(cache, current, period)
+        taken.append(current)
+        wait = _retry_after(counts.get(previous, 0), spent, elapsed, limit,
+                            period)
+        if wait:
+            # Между чтением и incr() токены успели потратить соседние
+            # запросы: возвращаем свои.
+            for key in taken:
+                try:
+                    cache.decr(key)
+                except ValueError:
+                    pass
+            return wait
+    return 0
+
+
+def take_token(scope, ident, limit, period, now=None):
+    """Потратить токен одной корзины; 0 или Retry-After."""
+    return take_tokens(scope, [(ident, limit, period)], now)
+
+
+def _take_tokens(scope, request):
+    """Потратить токены всех корзин запроса; 0 или Retry-After."""
+    buckets = []
+    for limits, ident in client_keys(request):
+        rate = limits.get(scope)
+        if rate:
+            buckets.append((ident, *parse_rate(rate)))
+    return take_tokens(scope, buckets) if buckets else 0
+
+
+def rate_limit(scope, methods=None):
+    """Декоратор: ограничить представление лимитом RATE_LIMITS[scope].
+
+    `methods` — какие методы считать; по умолчанию все.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = _take_tokens(scope, request)
+                if retry_after:
+                    response = render(request, 'core/429.html',
+                                      {'retry_after': retry_after},
+                                      status=429)
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
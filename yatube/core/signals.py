@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import auth
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    auth.forget_user(instance.pk)
+    # Запрос, прочитавший старую строку до фиксации, мог успеть вернуть
+    # её в кэш.
+    transaction.on_commit(lambda: auth.forget_user(instance.pk))
@@ -0,0 +1,120 @@
+"""Статика с отпечатками содержимого и заранее сжатыми копиями.
+
+`CompressedManifestStaticFilesStorage` при `collectstatic` пишет файлы
+с хэшем содержимого в имени (`bootstrap.min.3f2a….css`), манифест имён
+и рядом с текстовыми файлами сжатые копии `.br` и `.gz`. `{% static %}`
+берёт хэшированное имя из манифеста, который хранилище читает один раз
+при создании.
+
+`StaticFilesMiddleware` отдаёт файлы из `STATIC_ROOT` сам, без
+отдельного сервера: выбирает сжатую копию по `Accept-Encoding`,
+а файлам с хэшем в имени ставит годовой `Cache-Control: immutable` —
+при изменении содержимого у файла будет новое имя.
+"""
+import gzip
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+
+import brotli
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.ico', '.map')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=60'
+
+
+def _compressors():
+    # В порядке предпочтения при отдаче: brotli сжимает лучше.
+    yield 'br', '.br', brotli.compress
+    yield 'gzip', '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, *args, **kwargs):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(
+                *args, **kwargs):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if not kwargs.get('dry_run'):
+            for name in sorted(hashed_names):
+                self.compress(name)
+
+    def compress(self, name):
+        """Записать сжатые копии, если они заметно меньше файла."""
+        if not name.endswith(COMPRESSIBLE):
+            return
+        with self.open(name) as source:
+            data = source.read()
+        for _, suffix, compress in _compressors():
+            compressed = compress(data)
+            if len(compressed) < len(data) * 0.95:
+                with open(self.path(name + suffix), 'wb') as target:
+                    target.write(compressed)
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    encodings = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip().partition('=')[2]
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+class StaticFilesMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        # Манифест читается один раз, при создании хранилища.
+        self.hashed_names = set(
+            getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        if (request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(self.prefix)):
+            response = self.serve(request,
+                                  request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding = None
+        for coding, suffix, _ in _compressors():
+            if coding in accepted and os.path.isfile(path + suffix):
+                encoding, path = coding, path + suffix
+                break
+        response = FileResponse(open(path, 'rb'))
+        # Тип по исходному имени: FileResponse угадал бы его по .gz.
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = (
+            IMMUTABLE if name in self.hashed_names else REVALIDATE)
+        return response
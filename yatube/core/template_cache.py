@@ -0,0 +1,66 @@
+"""Разбор шаблонов заранее, при запуске процесса.
+
+С кэширующим загрузчиком шаблон читается с диска и разбирается один раз
+на процесс, но первые запросы к каждой странице всё равно платят за
+разбор. `warm_up()` разбирает все шаблоны из каталогов шаблонов проекта
+и приложений сразу при запуске (`TEMPLATES_WARM_UP`, включается в
+yatube/settings_production.py). Без кэширующего загрузчика, как при
+разработке, прогрев бесполезен и пропускается: шаблоны там читаются
+заново на каждый запрос, и правки видны без перезапуска.
+"""
+import logging
+import os
+import time
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+
+logger = logging.getLogger(__name__)
+
+
+def uses_cached_loader(engine):
+    return any(isinstance(loader, CachedLoader)
+               for loader in engine.template_loaders)
+
+
+def _dirs(loaders):
+    for loader in loaders:
+        if isinstance(loader, CachedLoader):
+            yield from _dirs(loader.loaders)
+        else:
+            yield from loader.get_dirs()
+
+
+def template_names(engine):
+    """Имена всех шаблонов в каталогах загрузчиков движка."""
+    names = set()
+    for directory in _dirs(engine.template_loaders):
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                if file_name.endswith(('.html', '.txt')):
+                    path = os.path.join(root, file_name)
+                    names.add(os.path.relpath(path, directory))
+    return sorted(names)
+
+
+def warm_up():
+    """Разобрать шаблоны всех движков с кэширующим загрузчиком."""
+    started = time.perf_counter()
+    count = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        engine = backend.engine
+        if not uses_cached_loader(engine):
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                logger.exception('Шаблон %s не разобран', name)
+                continue
+            count += 1
+    logger.info('Разобрано шаблонов: %s за %.0f мс', count,
+                (time.perf_counter() - started) * 1000)
+    return count
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..auth import check_shared_cache
+
+User = get_user_model()
+
+
+class CachedSessionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user',
+                                            password='password')
+
+    def setUp(self):
+        cache.clear()
+
+    def queries_on_repeat_get(self):
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('posts:index')
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.context['user'], self.user)
+        return len(context)
+
+    def test_authenticated_get_saves_two_queries(self):
+        """Сессия и пользователь берутся из кэша."""
+        cached = self.queries_on_repeat_get()
+        with override_settings(
+                SESSION_ENGINE='django.contrib.sessions.backends.db',
+                AUTHENTICATION_BACKENDS=[
+                    'django.contrib.auth.backends.ModelBackend']):
+            uncached = self.queries_on_repeat_get()
+        self.assertEqual(uncached - cached, 2)
+
+    def test_saved_user_is_reloaded(self):
+        client = Client()
+        client.force_login(self.user)
+        client.get(reverse('posts:index'))
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Новое'
+        user.save()
+        response = client.get(reverse('posts:index'))
+        self.assertEqual(response.context['user'].first_name, 'Новое')
+
+    def test_password_change_logs_out(self):
+        client = Client()
+        client.force_login(self.user)
+        client.get(reverse('posts:index'))
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-password')
+        user.save()
+        response = client.get(reverse('posts:index'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    def test_local_cache_warns(self):
+        """Кэш в памяти процесса с CachedModelBackend — предупреждение."""
+        memcached = {'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        }}
+        with override_settings(DEBUG=False):
+            ids = [warning.id for warning in check_shared_cache(None)]
+            self.assertEqual(ids, ['core.W001'])
+            with override_settings(CACHES=memcached):
+                self.assertEqual(check_shared_cache(None), [])
+        with override_settings(DEBUG=True):
+            self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,118 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import FeedEntry, Follow, Post
+
+from .. import jobs
+from ..models import Job
+
+User = get_user_model()
+
+calls = []
+
+
+@jobs.task(max_attempts=2)
+def record(value):
+    calls.append(value)
+
+
+@jobs.task
+def fail():
+    raise ValueError('сбой')
+
+
+@override_settings(JOBS_EAGER=False, JOBS_RETRY_DELAY=0)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_job_runs_once_per_key(self):
+        """Задача с тем же ключом не ставится, пока первая ждёт."""
+        jobs.enqueue(record, 1, key='record')
+        jobs.enqueue(record, 2, key='record')
+        jobs.enqueue(record, 3)
+        self.assertEqual(jobs.work(burst=True), 2)
+        self.assertEqual(calls, [1, 3])
+        self.assertEqual(
+            Job.objects.filter(status=Job.DONE).count(), 2)
+        jobs.enqueue(record, 4, key='record')
+        jobs.work(burst=True)
+        self.assertEqual(calls, [1, 3, 4])
+
+    def test_failed_job_is_retried(self):
+        jobs.enqueue(fail)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.work(burst=True)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, job.max_attempts)
+        self.assertIn('ValueError', job.error)
+
+    @override_settings(JOBS_RETRY_DELAY=60)
+    def test_retry_is_delayed(self):
+        jobs.enqueue(fail)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.work(burst=True), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now())
+
+    def test_stale_job_is_taken_again(self):
+        jobs.enqueue(record, 1)
+        Job.objects.update(
+            status=Job.RUNNING,
+            started=timezone.now() - timedelta(hours=1))
+        jobs.work(burst=True)
+        self.assertEqual(calls, [1])
+
+    def test_stale_job_fails_after_last_attempt(self):
+        """Задачу, ронявшую воркер каждую попытку, больше не берут."""
+        jobs.enqueue(record, 1)
+        Job.objects.update(
+            status=Job.RUNNING, attempts=2,
+            started=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.work(burst=True), 0)
+        self.assertEqual(calls, [])
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.error),
+                         (Job.FAILED, jobs.WORKER_DIED))
+
+    def test_post_side_effects_are_queued(self):
+        """Публикация не ждёт ленты и индекса, их делает воркер."""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        self.client.force_login(author)
+        self.client.post(reverse('posts:post_create'), {'text': 'пост'})
+        post = Post.objects.get()
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        jobs.work(burst=True)
+        self.assertTrue(
+            FeedEntry.objects.filter(post=post, user=reader).exists())
+        stats = jobs.stats()
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['done'], Job.objects.count())
+
+    def test_stats_show_depth(self):
+        jobs.enqueue(record, 1)
+        jobs.enqueue(record, 2, delay=60)
+        stats = jobs.stats()
+        self.assertEqual((stats['queued'], stats['ready']), (2, 1))
+        self.assertIsNotNone(stats['oldest_queued_s'])
+
+
+@override_settings(JOBS_EAGER=False)
+class RunWorkerTest(TransactionTestCase):
+    def test_worker_processes_drain_queue(self):
+        for value in range(20):
+            jobs.enqueue(record, value)
+        call_command('run_worker', processes=2, burst=True,
+                     stdout=StringIO())
+        self.assertEqual(
+            Job.objects.filter(status=Job.DONE).count(), 20)
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import profiling
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.staff, text='пост')
+
+    def setUp(self):
+        profiling.reset()
+        cache.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_is_measured(self):
+        """Запрос из выборки получает Server-Timing и попадает в сводку."""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('total;dur=', 'db;dur=', 'tpl;dur=', 'cache;desc='):
+            self.assertIn(metric, timing)
+        rows = {row['view']: row for row in profiling.summary()}
+        index = rows['posts:index']
+        self.assertEqual(index['samples'], 1)
+        self.assertGreater(index['queries'], 0)
+        self.assertGreater(index['template_ms'], 0)
+        self.assertGreater(index['cache_misses'], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_untouched(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(profiling.summary(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_profile_parameter_only_for_staff(self):
+        """Гостю ?_profile не включает даже сам замер."""
+        url = reverse('posts:index') + '?_profile'
+        with mock.patch.object(profiling, 'Record',
+                               wraps=profiling.Record) as record:
+            self.assertFalse(
+                self.client.get(url).has_header('Server-Timing'))
+            record.assert_not_called()
+        self.assertTrue(
+            self.staff_client.get(url).has_header('Server-Timing'))
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(profiling.percentile(values, 50), 50)
+        self.assertEqual(profiling.percentile(values, 99), 99)
+        self.assertIsNone(profiling.percentile([], 50))
+
+    def test_duplicate_queries(self):
+        record = profiling.Record()
+
+        def execute(sql, params, many, context):
+            return None
+
+        for params in ((1,), (1,), (2,)):
+            record.execute(execute, 'SELECT %s', params, False, {})
+        self.assertEqual(record.queries, 3)
+        self.assertEqual(record.duplicates, 1)
+
+    def test_stats_page_is_admin_only(self):
+        url = reverse('profiling')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        response = self.staff_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'core/profiling.html')
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+from ..ratelimit import take_token, take_tokens
+
+User = get_user_model()
+
+
+@override_settings(RATE_LIMITS={'add_comment': '2/m'},
+                   RATE_LIMITS_IP={'add_comment': '4/m'})
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(author=cls.user, text='пост')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:add_comment',
+                           kwargs={'post_id': self.post.pk})
+
+    def comment(self, user):
+        client = Client()
+        client.force_login(user)
+        return client.post(self.url, {'text': 'комментарий'})
+
+    def test_flood_gets_429(self):
+        """Сверх лимита — 429 с Retry-After, комментарий не создаётся."""
+        for _ in range(2):
+            self.assertEqual(self.comment(self.user).status_code, 302)
+        response = self.comment(self.user)
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 120)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_limit_is_per_user_and_ip(self):
+        """У каждого пользователя своя корзина, но IP у них общий."""
+        for _ in range(3):
+            self.comment(self.user)
+        self.assertEqual(self.comment(self.other).status_code, 302)
+        self.assertEqual(self.comment(self.other).status_code, 302)
+        self.assertEqual(self.comment(self.other).status_code, 429)
+        third = User.objects.create_user(username='third')
+        self.assertEqual(self.comment(third).status_code, 429)
+        self.assertEqual(Comment.objects.count(), 4)
+
+    def test_window_slides(self):
+        """На стыке периодов лимит не удваивается."""
+        for _ in range(2):
+            self.assertEqual(take_token('test', 'ip:1', 2, 60, now=50), 0)
+        self.assertEqual(take_token('test', 'ip:1', 2, 60, now=55), 35)
+        # Прошлый период ещё весит 5/6: оба токена на месте.
+        self.assertEqual(take_token('test', 'ip:1', 2, 60, now=70), 20)
+        # Половина прошлого периода ушла — один токен вернулся.
+        self.assertEqual(take_token('test', 'ip:1', 2, 60, now=90), 0)
+        self.assertEqual(take_token('test', 'ip:1', 2, 60, now=91), 29)
+        self.assertEqual(take_token('test', 'ip:1', 2, 60, now=125), 0)
+
+    def test_cache_round_trips(self):
+        """Счётчики читаются одним get_many(), отказ ничего не пишет."""
+        buckets = [('user:1', 1, 60), ('ip:1', 2, 60)]
+        with mock.patch.object(cache, 'get_many',
+                               wraps=cache.get_many) as get_many, \
+                mock.patch.object(cache, 'incr',
+                                  wraps=cache.incr) as incr:
+            self.assertEqual(take_tokens('test', buckets, now=10), 0)
+            self.assertEqual(get_many.call_count, 1)
+            self.assertEqual(incr.call_count, 2)
+            self.assertEqual(take_tokens('test', buckets, now=20), 100)
+            self.assertEqual(get_many.call_count, 2)
+            self.assertEqual(incr.call_count, 2)
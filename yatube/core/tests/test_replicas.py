@@ -0,0 +1,112 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..db.routers import PIN_COOKIE, ReplicaMiddleware, ReplicaRouter
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaMiddleware(self.view)
+
+    def view(self, request):
+        self.read_db = self.router.db_for_read(Post)
+        self.write_db = self.router.db_for_write(Post)
+        return HttpResponse()
+
+    def test_get_reads_from_replica(self):
+        response = self.middleware(self.factory.get('/'))
+        self.assertEqual(self.read_db, 'replica1')
+        self.assertEqual(self.write_db, 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_post_uses_primary_and_pins(self):
+        """После записи пользователь какое-то время читает основную базу."""
+        response = self.middleware(self.factory.post('/'))
+        self.assertEqual(self.read_db, 'default')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.middleware(request)
+        self.assertEqual(self.read_db, 'default')
+
+    def test_outside_request_reads_from_primary(self):
+        self.middleware(self.factory.get('/'))
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        response = self.middleware(self.factory.post('/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.middleware(self.factory.get('/'))
+        self.assertEqual(self.read_db, 'default')
+
+
+class SyncReplicasTest(TransactionTestCase):
+    def test_replica_is_a_copy(self):
+        user = User.objects.create_user(username='author')
+        Post.objects.create(author=user, text='пост')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            call_command('sync_replicas', path, stdout=StringIO())
+            replica = sqlite3.connect(path)
+            try:
+                rows = replica.execute(
+                    'SELECT text FROM posts_post').fetchall()
+            finally:
+                replica.close()
+        self.assertEqual(rows, [('пост',)])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class StaleReplicaTest(TransactionTestCase):
+    """Реплика в отдельном файле, отстающая от основной базы."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(author=self.author, text='старый пост')
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'replica.sqlite3')
+        call_command('sync_replicas', path, stdout=StringIO())
+        connections.databases['replica1'] = {
+            **connections.databases['default'], 'NAME': path}
+        self.addCleanup(self.drop_replica)
+
+    def drop_replica(self):
+        connections['replica1'].close()
+        del connections.databases['replica1']
+        if hasattr(connections._connections, 'replica1'):
+            delattr(connections._connections, 'replica1')
+        shutil.rmtree(self.directory)
+
+    def test_page_cache_filled_from_primary(self):
+        """Страница для кэша читается не с отставшей реплики."""
+        Post.objects.create(author=self.author, text='новый пост')
+        self.assertEqual(Post.objects.using('replica1').count(), 1)
+        urls = (reverse('posts:index'),
+                reverse('posts:profile', args=['author']),
+                reverse('api:post_list'))
+        for url in urls:
+            with self.subTest(url=url):
+                for _ in range(2):
+                    response = self.client.get(url)
+                    self.assertContains(response, 'новый пост')
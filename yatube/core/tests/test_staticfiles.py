@@ -0,0 +1,85 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+import brotli
+
+from django.conf import settings
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..staticfiles import (IMMUTABLE, REVALIDATE, StaticFilesMiddleware,
+                           accepted_encodings)
+
+STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CSS = 'css/bootstrap.min.css'
+
+
+@override_settings(
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_STORAGE=(
+        'core.staticfiles.CompressedManifestStaticFilesStorage'),
+)
+class StaticFilesTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.middleware = StaticFilesMiddleware(
+            lambda request: HttpResponse(status=404))
+        self.hashed = Template(
+            '{% load static %}{% static "' + CSS + '" %}'
+        ).render(Context())
+
+    def get(self, url, encoding=''):
+        request = RequestFactory().get(url, HTTP_ACCEPT_ENCODING=encoding)
+        return self.middleware(request)
+
+    def test_static_tag_uses_hashed_name(self):
+        self.assertRegex(self.hashed,
+                         r'^/static/css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        path = os.path.join(STATIC_ROOT, self.hashed[len('/static/'):])
+        self.assertTrue(os.path.exists(path + '.gz'))
+        self.assertTrue(os.path.exists(path + '.br'))
+
+    def test_brotli_preferred(self):
+        response = self.get(self.hashed, 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        with open(os.path.join(settings.BASE_DIR, 'static', CSS),
+                  'rb') as original:
+            self.assertEqual(
+                brotli.decompress(b''.join(response.streaming_content)),
+                original.read())
+
+    def test_compressed_copy_is_negotiated(self):
+        response = self.get(self.hashed, 'gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        with open(os.path.join(settings.BASE_DIR, 'static', CSS),
+                  'rb') as original:
+            self.assertEqual(
+                gzip.decompress(b''.join(response.streaming_content)),
+                original.read())
+
+    def test_plain_and_unhashed_files(self):
+        response = self.get(self.hashed, 'gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(self.get(f'/static/{CSS}')['Cache-Control'],
+                         REVALIDATE)
+        self.assertEqual(self.get('/static/../manage.py').status_code, 404)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('br;q=1.0, GZIP, x;q=0'),
+                         {'br', 'gzip'})
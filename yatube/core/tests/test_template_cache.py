@@ -0,0 +1,31 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from ..management.commands.bench_templates import VARIANTS
+from ..template_cache import warm_up
+
+
+class TemplateWarmUpTest(SimpleTestCase):
+    @override_settings(TEMPLATES=VARIANTS['с кэшем'])
+    def test_templates_are_parsed_once(self):
+        """Прогрев кладёт все шаблоны в кэш загрузчика."""
+        self.assertGreater(warm_up(), 0)
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertIn('posts/index.html',
+                      {key.split('-')[0] for key in loader.get_template_cache})
+
+    @override_settings(TEMPLATES=VARIANTS['без кэша'])
+    def test_skipped_without_cached_loader(self):
+        self.assertEqual(warm_up(), 0)
+
+    def test_bench_command(self):
+        """Замер не трогает общий кэш с сессиями и лимитами."""
+        cache.set('session-like', 1)
+        out = StringIO()
+        call_command('bench_templates', iterations=2, stdout=out)
+        self.assertIn('Ускорение', out.getvalue())
+        self.assertEqual(cache.get('session-like'), 1)
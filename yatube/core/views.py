@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 
+from . import jobs, profiling
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +19,15 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+@staff_member_required
+def profiling_stats(request):
+    if request.method == 'POST':
+        profiling.reset()
+    context = {
+        'rows': profiling.summary(),
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+        'jobs': jobs.stats(),
+    }
+    return render(request, 'core/profiling.html', context)
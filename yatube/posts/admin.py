@@ -3,6 +3,8 @@ from django.contrib import admin
 from .models import Post
 from .models import Group
 from .models import Comment
+from .models import ArchivedPost
+from .search import filter_posts
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -18,7 +20,22 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по обратному индексу вместо LIKE '%...%' по всей таблице.
+        if not search_term:
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
 admin.site.register(Comment)
+
+
+class ArchivedPostAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group', 'archived')
+    list_filter = ('pub_date',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(ArchivedPost, ArchivedPostAdmin)
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
+from PIL import Image
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'Посты'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Pillow откажется декодировать картинки больше этого размера,
+        # в том числе при проверке ImageField и нарезке миниатюр.
+        Image.MAX_IMAGE_PIXELS = settings.POSTS_IMAGE_MAX_PIXELS
@@ -0,0 +1,82 @@
+"""Перенос старых постов из Post в архивные таблицы.
+
+Почти все запросы читают свежие посты, а индексы и страницы Post
+растут со всей историей. `archive_posts()` пачками переносит посты
+старше `POSTS_ARCHIVE_AFTER_DAYS` дней вместе с комментариями
+в ArchivedPost и ArchivedComment, и Post остаётся небольшим.
+
+Архивные посты сохраняют id (Post в SQLite создаётся с AUTOINCREMENT,
+так что новые посты этих id не получат). Страница поста находит их
+в архиве, если поста нет в Post, а профиль и группа после свежих
+постов листают архивные. Главная, лента подписок и поиск показывают
+только Post.
+
+Счётчики автора и группы архивные посты не уменьшают: посты удаляются
+из Post внутри `counters.frozen()`, а `recount` считает обе таблицы.
+Записи лент и поискового индекса для перенесённых постов удаляются.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import cache, counters
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'updated', 'author_id',
+               'group_id', 'image', 'thumbnails', 'comments_count',
+               'comments_changed')
+COMMENT_FIELDS = ('id', 'post_id', 'author_id', 'text', 'created')
+
+
+def cutoff(days=None):
+    if days is None:
+        days = settings.POSTS_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_batch(post_ids):
+    """Перенести посты с комментариями; вернуть число комментариев."""
+    with transaction.atomic():
+        posts = Post.objects.filter(pk__in=post_ids)
+        comments = Comment.objects.filter(post_id__in=post_ids)
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(**row) for row in posts.values(*POST_FIELDS))
+        archived = [ArchivedComment(**row)
+                    for row in comments.values(*COMMENT_FIELDS)]
+        ArchivedComment.objects.bulk_create(archived)
+        # Записи лент и поиска удалят каскад и сигналы, а счётчики
+        # остаются: они учитывают и архив.
+        with counters.frozen():
+            posts.delete()
+    return len(archived)
+
+
+def archive_posts(days=None, batch_size=500, on_batch=None):
+    """Перенести в архив посты старше days дней пачками по batch_size.
+
+    Каждая пачка — отдельная транзакция, так что прерванный перенос
+    можно просто запустить снова. Возвращает (посты, комментарии).
+    """
+    before = cutoff(days)
+    old = Post.objects.filter(pub_date__lt=before).order_by('pub_date', 'pk')
+    posts = comments = 0
+    while True:
+        post_ids = list(old.values_list('pk', flat=True)[:batch_size])
+        if not post_ids:
+            break
+        comments += archive_batch(post_ids)
+        posts += len(post_ids)
+        if on_batch:
+            on_batch(posts, comments)
+    if posts:
+        cache.bump_version()
+    return posts, comments
+
+
+def vacuum():
+    """Вернуть системе место, освободившееся в файле SQLite."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM')
@@ -0,0 +1,213 @@
+"""Нагрузочный прогон горячих страниц постов.
+
+`seed()` наполняет базу правдоподобными данными, `Replay` прогоняет
+через WSGI-обработчик взвешенную смесь запросов и меряет время ответа
+и число SQL-запросов. Используется командой `manage.py bench`.
+"""
+import random
+import time
+from io import BytesIO, StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+from PIL import Image
+
+from core.profiling import percentile
+
+from . import counters, search
+from .models import Comment, Follow, Group, Post, User
+from .transfer import manual_dates
+
+BATCH_SIZE = 500
+
+# Доля запросов каждого вида в смеси по умолчанию.
+DEFAULT_MIX = {
+    'index': 30,
+    'group_list': 15,
+    'profile': 15,
+    'post_detail': 25,
+    'follow_index': 10,
+    'add_comment': 5,
+}
+
+
+def _images(count, rng):
+    names = []
+    for i in range(count):
+        buffer = BytesIO()
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', (1200, 800), color).save(buffer, 'JPEG')
+        names.append(default_storage.save(f'posts/bench-{i}.jpg',
+                                          ContentFile(buffer.getvalue())))
+    return names
+
+
+def seed(users=200, groups=10, posts=5000, comments=10000, follows=2000,
+         images=20, rng=None):
+    """Наполнить базу; счётчики, ленты и поиск пересчитываются в конце."""
+    rng = rng or random.Random()
+    fake = Faker('ru_RU')
+    fake.seed_instance(rng.random())
+    now = time.time()
+
+    password = make_password('bench')
+    User.objects.bulk_create(
+        (User(username=f'bench-{i}', first_name=fake.first_name(),
+              last_name=fake.last_name(), password=password)
+         for i in range(users)),
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    mixer.cycle(groups).blend(Group, title=mixer.faker.company)
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+    image_names = _images(images, rng)
+
+    def dates(count):
+        # Посты и комментарии за последний год, в порядке id.
+        return sorted(
+            fake.date_time_between(start_date='-1y', tzinfo=timezone.utc)
+            for _ in range(count)
+        )
+
+    post_dates = dates(posts)
+    with manual_dates(Post._meta.get_field('pub_date')):
+        Post.objects.bulk_create(
+            (Post(
+                author_id=rng.choice(user_ids),
+                group_id=rng.choice(group_ids + [None]),
+                text=fake.text(rng.randint(50, 1500)),
+                image=rng.choice(image_names) if rng.random() < 0.3 else '',
+                pub_date=pub_date,
+            ) for pub_date in post_dates),
+            batch_size=BATCH_SIZE,
+        )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+
+    with manual_dates(Comment._meta.get_field('created')):
+        Comment.objects.bulk_create(
+            (Comment(post_id=rng.choice(post_ids),
+                     author_id=rng.choice(user_ids),
+                     text=fake.sentence(), created=created)
+             for created in dates(comments)),
+            batch_size=BATCH_SIZE,
+        )
+
+    pairs = {tuple(rng.sample(user_ids, 2)) for _ in range(follows)}
+    Follow.objects.bulk_create(
+        (Follow(user_id=user, author_id=author) for user, author in pairs),
+        batch_size=BATCH_SIZE,
+    )
+
+    # bulk_create не шлёт сигналов: производные данные строим сами.
+    counters.recount_authors()
+    counters.recount_groups()
+    counters.recount_posts()
+    call_command('backfill_feed', clear=True, stdout=StringIO())
+    search.rebuild()
+    return time.time() - now
+
+
+def _summary(timings, queries, errors, elapsed=None):
+    summary = {
+        'requests': len(timings),
+        'errors': errors,
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'p99_ms': percentile(timings, 99),
+        'mean_ms': sum(timings) / len(timings) if timings else None,
+        'queries_per_request': (
+            sum(queries) / len(queries) if queries else None),
+    }
+    if elapsed:
+        summary['rps'] = len(timings) / elapsed
+    return summary
+
+
+class Replay:
+    """Взвешенная смесь запросов к страницам постов."""
+
+    def __init__(self, mix=None, rng=None, clients=20):
+        self.mix = mix or DEFAULT_MIX
+        self.rng = rng or random.Random()
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        self.usernames = list(Post.objects.values_list(
+            'author__username', flat=True).distinct())
+        self.post_ids = list(Post.objects.values_list('pk', flat=True))
+        readers = list(Follow.objects.values_list(
+            'user', flat=True).distinct()[:clients])
+        self.clients = []
+        for user in User.objects.filter(pk__in=readers):
+            client = Client()
+            client.force_login(user)
+            self.clients.append(client)
+        self.guest = Client()
+
+    def request(self, name):
+        """Клиент, метод и URL одного запроса вида `name`."""
+        rng = self.rng
+        if name == 'index':
+            return self.guest, 'get', reverse('posts:index'), None
+        if name == 'group_list':
+            slug = rng.choice(self.slugs)
+            return self.guest, 'get', reverse(
+                'posts:group_list', kwargs={'slug': slug}), None
+        if name == 'profile':
+            username = rng.choice(self.usernames)
+            return self.guest, 'get', reverse(
+                'posts:profile', kwargs={'username': username}), None
+        if name == 'post_detail':
+            post_id = rng.choice(self.post_ids)
+            return self.guest, 'get', reverse(
+                'posts:post_detail', kwargs={'post_id': post_id}), None
+        client = rng.choice(self.clients)
+        if name == 'follow_index':
+            return client, 'get', reverse('posts:follow_index'), None
+        if name == 'add_comment':
+            post_id = rng.choice(self.post_ids)
+            return client, 'post', reverse(
+                'posts:add_comment', kwargs={'post_id': post_id}), {
+                'text': 'Комментарий из нагрузочного прогона'}
+        raise ValueError(f'Неизвестный вид запроса: {name}')
+
+    def run(self, requests=1000, warmup=100):
+        """Прогнать запросы и вернуть сводку по видам и общую."""
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        for name in self.rng.choices(names, weights, k=warmup):
+            self._send(name)
+        timings = {name: [] for name in names}
+        queries = {name: [] for name in names}
+        errors = {name: 0 for name in names}
+        started = time.perf_counter()
+        for name in self.rng.choices(names, weights, k=requests):
+            elapsed, query_count, ok = self._send(name)
+            timings[name].append(elapsed)
+            queries[name].append(query_count)
+            errors[name] += not ok
+        elapsed = time.perf_counter() - started
+        views = {name: _summary(timings[name], queries[name], errors[name])
+                 for name in names if timings[name]}
+        total = _summary(
+            [t for name in names for t in timings[name]],
+            [q for name in names for q in queries[name]],
+            sum(errors.values()),
+            elapsed,
+        )
+        return {'total': total, 'views': views}
+
+    def _send(self, name):
+        client, method, url, data = self.request(name)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = (time.perf_counter() - started) * 1000
+        return elapsed, len(context), response.status_code < 400
@@ -0,0 +1,56 @@
+"""Кэш страниц со списками постов.
+
+Ключ страницы содержит номер версии, который увеличивается сигналами
+при сохранении и удалении Post и Group. Поэтому кэш можно хранить
+часами: любое изменение постов сразу делает старые ключи недостижимыми.
+В кэше лежит только список постов страницы, а шапка и прочие данные
+пользователя рендерятся на каждый запрос, так что гости и
+авторизованные пользователи читают одну и ту же запись. Страница для
+кэша читается из основной базы, даже если запрос ходит на реплику.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db.routers import read_from_primary
+
+VERSION_KEY = 'posts:version'
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Версия начинается со времени, а не с 1: если ключ вытеснят из
+        # кэша, старые страницы не совпадут с новой версией.
+        version = int(time.time() * 1000)
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        get_version()
+
+
+def page_key(scope, *parts):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'posts:page:{get_version()}:{scope}:{digest}'
+
+
+def cached_cursor_page(scope, paginator, after=None, before=None):
+    """Курсорная страница `paginator` из кэша или из базы."""
+    key = page_key(scope, after, before)
+    state = cache.get(key)
+    if state is not None:
+        return paginator.restore_page(state)
+    # Ключ уже с новой версией, а реплика могла ещё не получить запись.
+    with read_from_primary():
+        page = paginator.get_page(after=after, before=before)
+    cache.set(key, paginator.get_state(page),
+              settings.POSTS_PAGE_CACHE_TIMEOUT)
+    return page
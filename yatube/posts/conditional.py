@@ -0,0 +1,89 @@
+"""Валидаторы условных GET для страниц поста, автора и группы.
+
+Каждая функция делает один-два дешёвых запроса по первичному ключу
+и вместе с версией кэша страниц (`posts.cache`, растёт при любом
+изменении постов и групп) даёт ETag. Если он совпал с `If-None-Match`,
+декоратор `condition` отвечает 304, не выполняя представление. В ETag
+входит id пользователя: шапка и кнопки страниц у всех разные.
+Комментарии поста не считаются: их число и время изменения хранятся
+в Post (`counters.bump_post`).
+"""
+import hashlib
+
+from . import cache
+from .models import ArchivedPost, Follow, Group, Post, User
+
+
+def _memoized(function):
+    """Считать валидаторы один раз на запрос для ETag и Last-Modified."""
+    def wrapper(request, **kwargs):
+        key = (function.__name__, tuple(sorted(kwargs.items())))
+        memo = request.__dict__.setdefault('_posts_validators', {})
+        if key not in memo:
+            memo[key] = function(request, **kwargs)
+        return memo[key]
+    return wrapper
+
+
+def _etag(request, *parts):
+    user = request.user.pk if request.user.is_authenticated else None
+    data = repr((user, request.GET.urlencode(), *parts))
+    return hashlib.md5(data.encode()).hexdigest()
+
+
+@_memoized
+def _post_state(request, post_id):
+    # Пост ищется и в архиве, как это делает страница поста.
+    for model in (Post, ArchivedPost):
+        state = model.objects.filter(pk=post_id).values(
+            'updated', 'comments_count', 'comments_changed',
+            'group__title', 'author__first_name', 'author__last_name',
+            'author__stats__posts_count',
+        ).first()
+        if state is not None:
+            return state
+    return None
+
+
+def post_detail_etag(request, post_id):
+    state = _post_state(request, post_id=post_id)
+    if state is None:
+        return None
+    return _etag(request, *sorted(state.items()))
+
+
+def post_detail_last_modified(request, post_id):
+    state = _post_state(request, post_id=post_id)
+    if state is None:
+        return None
+    return max(filter(None, (state['updated'], state['comments_changed'])))
+
+
+def profile_etag(request, username):
+    author = User.objects.filter(username=username).values(
+        'pk', 'first_name', 'last_name', 'stats__posts_count',
+        'stats__comments_count', 'stats__followers_count',
+        'stats__following_count',
+    ).first()
+    if author is None:
+        return None
+    following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(user=request.user,
+                                  author_id=author['pk']).exists()
+    )
+    return _etag(request, cache.get_version(), sorted(author.items()),
+                 following)
+
+
+def group_etag(request, slug):
+    group = Group.objects.filter(slug=slug).values_list(
+        'pk', 'title', 'description', 'posts_count').first()
+    if group is None:
+        return None
+    return _etag(request, cache.get_version(), group)
+
+
+def posts_etag(request, **kwargs):
+    """ETag страниц, которые меняются только вместе с постами и группами."""
+    return _etag(request, cache.get_version())
@@ -0,0 +1,161 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Профиль и страница поста читают готовые числа из AuthorStats,
+Group.posts_count и Post.comments_count вместо `COUNT(*)` по всей
+истории автора или обсуждения.
+"""
+import operator
+import threading
+from contextlib import contextmanager
+from functools import reduce
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (ArchivedComment, ArchivedPost, AuthorStats, Comment,
+                     Follow, Group, Post, User)
+
+BATCH_SIZE = 500
+
+_local = threading.local()
+
+# Поле AuthorStats -> пары (модель, поле этой модели со ссылкой на
+# автора); архивные посты и комментарии тоже считаются.
+SOURCES = {
+    'posts_count': ((Post, 'author'), (ArchivedPost, 'author')),
+    'comments_count': ((Comment, 'author'), (ArchivedComment, 'author')),
+    'followers_count': ((Follow, 'author'),),
+    'following_count': ((Follow, 'user'),),
+}
+
+
+def _count(model, field, outer='pk'):
+    rows = model.objects.filter(**{field: OuterRef(outer)}).order_by()
+    return Coalesce(
+        Subquery(rows.values(field).annotate(n=Count('pk')).values('n')),
+        0,
+    )
+
+
+def _total(sources, outer='pk'):
+    counts = [_count(model, field, outer) for model, field in sources]
+    return reduce(operator.add, counts)
+
+
+def _annotated_users(users):
+    return users.annotate(**{
+        name: _total(sources) for name, sources in SOURCES.items()
+    })
+
+
+def recount_author(user_id):
+    """Пересчитать и сохранить счётчики одного автора."""
+    user = _annotated_users(User.objects.filter(pk=user_id)).get()
+    stats, _ = AuthorStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={name: getattr(user, name) for name in SOURCES},
+    )
+    return stats
+
+
+def recount_authors(users=None):
+    """Пересчитать счётчики всех авторов пачками по BATCH_SIZE."""
+    if users is None:
+        users = User.objects.all()
+    users = _annotated_users(users.order_by('pk'))
+    batch = []
+    total = 0
+    for user in users.iterator(chunk_size=BATCH_SIZE):
+        batch.append(AuthorStats(
+            user_id=user.pk,
+            **{name: getattr(user, name) for name in SOURCES}
+        ))
+        if len(batch) >= BATCH_SIZE:
+            total += _save_stats(batch)
+            batch = []
+    if batch:
+        total += _save_stats(batch)
+    return total
+
+
+def _save_stats(batch):
+    existing = set(AuthorStats.objects.filter(
+        user_id__in=[stats.user_id for stats in batch],
+    ).values_list('user_id', flat=True))
+    AuthorStats.objects.bulk_update(
+        [stats for stats in batch if stats.user_id in existing],
+        list(SOURCES),
+    )
+    AuthorStats.objects.bulk_create(
+        [stats for stats in batch if stats.user_id not in existing]
+    )
+    return len(batch)
+
+
+def recount_groups():
+    return Group.objects.update(posts_count=_total(
+        ((Post, 'group'), (ArchivedPost, 'group'))))
+
+
+def recount_posts():
+    """Пересчитать число комментариев постов, в том числе архивных."""
+    return (
+        Post.objects.update(
+            comments_count=_total(((Comment, 'post'),)))
+        + ArchivedPost.objects.update(
+            comments_count=_total(((ArchivedComment, 'post'),)))
+    )
+
+
+@contextmanager
+def frozen():
+    """Не менять счётчики при удалениях в этом потоке.
+
+    Так из Post и Comment уходят строки, которые переносятся в архив
+    и продолжают считаться (posts/archive.py).
+    """
+    _local.frozen = True
+    try:
+        yield
+    finally:
+        _local.frozen = False
+
+
+def is_frozen():
+    return getattr(_local, 'frozen', False)
+
+
+def get_stats(user):
+    """Счётчики автора; отсутствующая строка пересчитывается на месте."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return recount_author(user.pk)
+
+
+def bump_author(user_id, field, delta, create=False):
+    """Сдвинуть счётчик автора на delta.
+
+    Если строки ещё нет, при `create=True` она считается с нуля (и уже
+    учитывает изменение), иначе изменение пропускается: строку
+    пересчитает первое чтение через get_stats.
+    """
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta})
+    if not updated and create:
+        recount_author(user_id)
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=F('posts_count') + delta)
+
+
+def bump_post(post_id, delta):
+    """Сдвинуть число комментариев поста и отметить время изменения."""
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta,
+        comments_changed=timezone.now(),
+    )
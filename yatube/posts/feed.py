@@ -0,0 +1,135 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+Пост попадает в FeedEntry каждого подписчика в момент публикации,
+а при подписке в ленту копируются последние посты автора. Для авторов,
+у которых подписчиков больше `FEED_FANOUT_LIMIT`, записи не создаются:
+их посты подмешиваются в ленту при чтении (fan-out-on-read).
+
+Переход лимита записывается в `AuthorStats.celebrity_since`, и автор
+читается на лету, пока подписчиков не станет не больше
+`FEED_FANOUT_RESUME`: подписки и отписки около лимита ничего не
+перекладывают. Тогда посты, написанные с `celebrity_since`, один раз
+раскладываются по лентам (`refill_author`), иначе они пропали бы.
+"""
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import AuthorStats, FeedEntry, Follow, Post
+
+
+def _celebrities():
+    return AuthorStats.objects.filter(
+        Q(followers_count__gt=settings.FEED_FANOUT_LIMIT)
+        | Q(celebrity_since__isnull=False))
+
+
+def is_celebrity(author_id):
+    """Слишком ли много подписчиков у автора для fan-out-on-write."""
+    return _celebrities().filter(user_id=author_id).exists()
+
+
+def celebrities_followed_by(user):
+    """Авторы из подписок пользователя, чьи посты читаются на лету."""
+    return list(_celebrities().filter(
+        user__following__user=user,
+    ).values_list('user_id', flat=True))
+
+
+def _create_entries(entries):
+    FeedEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def mark_celebrity(author_id):
+    """Запомнить, с какого момента посты автора читаются на лету."""
+    AuthorStats.objects.filter(
+        user_id=author_id, celebrity_since=None,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).update(celebrity_since=timezone.now())
+
+
+def _demoted():
+    return AuthorStats.objects.filter(
+        celebrity_since__isnull=False,
+        followers_count__lte=settings.FEED_FANOUT_RESUME,
+    )
+
+
+def needs_refill(author_id):
+    """Пора ли снова раскладывать посты автора по лентам."""
+    return _demoted().filter(user_id=author_id).exists()
+
+
+def _fan_out(author_id, posts):
+    """Разложить посты [(id, дата)] по лентам подписчиков автора."""
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True)
+    batch = []
+    for user_id in followers.iterator(chunk_size=settings.FEED_BATCH_SIZE):
+        batch.extend(
+            FeedEntry(user_id=user_id, post_id=post_id, author_id=author_id,
+                      pub_date=pub_date)
+            for post_id, pub_date in posts
+        )
+        if len(batch) >= settings.FEED_BATCH_SIZE:
+            _create_entries(batch)
+            batch = []
+    if batch:
+        _create_entries(batch)
+
+
+def fan_out_post(post):
+    """Разложить новый пост по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    _fan_out(post.author_id, [(post.pk, post.pub_date)])
+
+
+def add_author_to_feed(user_id, author_id):
+    """Скопировать последние посты автора в ленту нового подписчика."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date')[:settings.FEED_BACKFILL_LIMIT]
+    _create_entries([
+        FeedEntry(user_id=user_id, post_id=post_id, author_id=author_id,
+                  pub_date=pub_date)
+        for post_id, pub_date in posts
+    ])
+
+
+def refill_author(author_id):
+    """Разложить посты, написанные, пока автор читался на лету."""
+    since = _demoted().filter(user_id=author_id).values_list(
+        'celebrity_since', flat=True).first()
+    # Признак снимается до копирования: новые посты с этого момента
+    # раскладывает fan_out_post, а параллельная задача ничего не найдёт.
+    if since is None or not _demoted().filter(
+            user_id=author_id).update(celebrity_since=None):
+        return
+    posts = list(Post.objects.filter(
+        author_id=author_id, pub_date__gte=since,
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_LIMIT])
+    _fan_out(author_id, posts)
+
+
+def remove_author_from_feed(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def get_feed(user):
+    """Посты авторов, на которых подписан пользователь."""
+    celebrities = celebrities_followed_by(user)
+    if not celebrities:
+        return Post.objects.filter(feed_entries__user=user).annotate(
+            feed_date=F('feed_entries__pub_date'),
+            feed_post=F('feed_entries__post'),
+        ).order_by('-feed_date', '-feed_post')
+    materialized = FeedEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=materialized) | Q(author_id__in=celebrities)
+    ).order_by('-pub_date', '-pk')
@@ -7,6 +7,34 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Загрузки, отброшенные BoundedImageUploadHandler, убираются из
+        # files, а их причина выводится как ошибка поля.
+        self.upload_errors = {
+            name: upload.upload_error
+            for name, upload in self.files.items()
+            if getattr(upload, 'upload_error', None)
+        }
+        if self.upload_errors:
+            self.files = self.files.copy()
+            for name in self.upload_errors:
+                del self.files[name]
+
+    def clean_image(self):
+        if 'image' in self.upload_errors:
+            raise forms.ValidationError(self.upload_errors['image'])
+        return self.cleaned_data['image']
+
+    def save(self, commit=True):
+        post = super().save(commit=False)
+        if 'image' in self.changed_data:
+            # Старые миниатюры относятся к прежней картинке.
+            post.thumbnails = ''
+        if commit:
+            post.save()
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
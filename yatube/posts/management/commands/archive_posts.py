@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts import archive
+
+
+class Command(BaseCommand):
+    help = ('Переносит посты старше POSTS_ARCHIVE_AFTER_DAYS дней '
+            'с комментариями в архивные таблицы')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help='Возраст поста в днях; по умолчанию из настроек',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов переносить одной транзакцией',
+        )
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='После переноса сжать файл базы SQLite (VACUUM)',
+        )
+
+    def handle(self, *args, **options):
+        posts, comments = archive.archive_posts(
+            options['days'], options['batch_size'], on_batch=self.report)
+        self.report(posts, comments)
+        if options['vacuum']:
+            archive.vacuum()
+            self.stdout.write('База сжата')
+
+    def report(self, posts, comments):
+        self.stdout.write(f'В архиве: постов {posts}, '
+                          f'комментариев {comments}')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = 'Заполняет материализованные ленты подписок по таблице Follow'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', dest='username',
+            help='Пересобрать ленту только для этого пользователя',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить существующие записи ленты перед заполнением',
+        )
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.order_by('user_id', 'author_id')
+        entries = FeedEntry.objects.all()
+        if options['username']:
+            follows = follows.filter(user__username=options['username'])
+            entries = entries.filter(user__username=options['username'])
+        if options['clear']:
+            entries.delete()
+        count = 0
+        pairs = follows.values_list('user_id', 'author_id')
+        for user_id, author_id in pairs.iterator():
+            feed.add_author_to_feed(user_id, author_id)
+            count += 1
+        self.stdout.write(f'Обработано подписок: {count}')
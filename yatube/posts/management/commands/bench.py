@@ -0,0 +1,143 @@
+import json
+import os
+import random
+import subprocess
+import tempfile
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+from posts import bench
+from posts.models import Post
+
+
+# Свой кэш в памяти процесса: прогон очищает кэш и не должен стирать
+# сессии, лимиты и счётчики входа из общего кэша сервера. Лимиты
+# запросов на время прогона сняты: все клиенты приходят с 127.0.0.1.
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench',
+    }
+}
+
+# Своя база, а не TEST.NAME: прогон не должен затирать базу тестов,
+# запущенных в это же время.
+BENCH_DB_NAME = os.path.join(settings.BASE_DIR, 'bench_db.sqlite3')
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон страниц постов на отдельной базе: '
+            'p50/p95/p99, запросы в секунду и SQL-запросы на ответ')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=2000)
+        parser.add_argument('--images', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--warmup', type=int, default=200)
+        parser.add_argument(
+            '--mix', default='',
+            help='Веса видов запросов, например "index=5,post_detail=1"',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--output', default='bench.json',
+            help='Куда записать результаты в JSON',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять базу прогона и использовать её повторно',
+        )
+
+    def parse_mix(self, value):
+        if not value:
+            return bench.DEFAULT_MIX
+        mix = {}
+        for item in value.split(','):
+            name, _, weight = item.partition('=')
+            if name not in bench.DEFAULT_MIX or not weight.isdigit():
+                raise CommandError(f'Неверный элемент смеси: {item}')
+            mix[name] = int(weight)
+        return mix
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options['mix'])
+        rng = random.Random(options['seed'])
+        setup_test_environment()
+        test_settings = connection.settings_dict['TEST']
+        test_name = test_settings.get('NAME')
+        test_settings['NAME'] = BENCH_DB_NAME
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root,
+                                      CACHES=BENCH_CACHES,
+                                      RATE_LIMITS={}, RATE_LIMITS_IP={}):
+                report = self.run(options, mix, rng)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+            test_settings['NAME'] = test_name
+            teardown_test_environment()
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.print_report(report)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+    def run(self, options, mix, rng):
+        seeded = None
+        if not Post.objects.exists():
+            seeded = bench.seed(
+                users=options['users'], groups=options['groups'],
+                posts=options['posts'], comments=options['comments'],
+                follows=options['follows'], images=options['images'],
+                rng=rng,
+            )
+        cache.clear()
+        replay = bench.Replay(mix=mix, rng=rng)
+        results = replay.run(requests=options['requests'],
+                             warmup=options['warmup'])
+        return {
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'commit': self.git_commit(),
+            'seed_seconds': seeded,
+            'options': {key: options[key] for key in (
+                'users', 'groups', 'posts', 'comments', 'follows',
+                'images', 'requests', 'warmup', 'seed')},
+            'mix': mix,
+            **results,
+        }
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_report(self, report):
+        line = '{:<14}{:>8}{:>10}{:>10}{:>10}{:>10}{:>8}'
+        self.stdout.write(line.format(
+            'view', 'req', 'p50 мс', 'p95 мс', 'p99 мс', 'запросы', 'ошибки'))
+        rows = list(report['views'].items()) + [('total', report['total'])]
+        for name, row in rows:
+            self.stdout.write(line.format(
+                name, row['requests'], f'{row["p50_ms"]:.1f}',
+                f'{row["p95_ms"]:.1f}', f'{row["p99_ms"]:.1f}',
+                f'{row["queries_per_request"]:.1f}', row['errors'],
+            ))
+        self.stdout.write(f'Запросов в секунду: {report["total"]["rps"]:.1f}')
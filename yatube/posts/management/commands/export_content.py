@@ -0,0 +1,41 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты и комментарии вместе '
+            'с архивными, подписки в NDJSON; файл .gz сжимается')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки или "-" для stdout')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из базы за раз',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path == '-':
+            stream = sys.stdout
+        elif path.endswith('.gz'):
+            stream = gzip.open(path, 'wt', encoding='utf-8')
+        else:
+            stream = open(path, 'w', encoding='utf-8')
+        try:
+            progress = transfer.export(stream, options['chunk_size'],
+                                       on_chunk=self.report)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        self.report(progress)
+
+    def report(self, progress):
+        counts = ', '.join(f'{name}: {count}'
+                           for name, count in progress.counts.items())
+        # При выгрузке в stdout отчёт не должен попасть в данные.
+        self.stderr.write(f'Выгружено {counts} '
+                          f'({progress.rate():.0f} строк/с)')
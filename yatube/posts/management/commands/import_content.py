@@ -0,0 +1,62 @@
+import gzip
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_content. Повторный запуск с тем же '
+            'источником продолжает прерванную загрузку')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки или "-" для stdin')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк записывать одной транзакцией',
+        )
+        parser.add_argument(
+            '--source',
+            help='Имя источника для сопоставления id; по умолчанию имя файла',
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поиск после загрузки',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        source = options['source'] or os.path.basename(path)
+        if path == '-':
+            if not options['source']:
+                raise CommandError('Для stdin укажите --source')
+            stream = sys.stdin
+        elif path.endswith('.gz'):
+            stream = gzip.open(path, 'rt', encoding='utf-8')
+        else:
+            stream = open(path, encoding='utf-8')
+        importer = transfer.Importer(source, options['batch_size'],
+                                     on_batch=self.report)
+        try:
+            progress = importer.run(stream)
+        except ValueError as error:
+            raise CommandError(f'Ошибка в файле: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.report(progress)
+        skipped = sum(progress.skipped.values())
+        if skipped:
+            self.stdout.write(f'Пропущено загруженных ранее или без '
+                              f'связанных объектов: {skipped}')
+        if not options['no_rebuild']:
+            transfer.rebuild_derived()
+            self.stdout.write('Счётчики, ленты и поиск пересчитаны')
+
+    def report(self, progress):
+        counts = ', '.join(f'{name}: {count}'
+                           for name, count in progress.counts.items())
+        self.stdout.write(f'Загружено {counts} '
+                          f'({progress.rate():.0f} строк/с)')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики постов, комментариев и подписок '
+            'авторов и групп и число комментариев постов')
+
+    def handle(self, *args, **options):
+        authors = counters.recount_authors()
+        groups = counters.recount_groups()
+        posts = counters.recount_posts()
+        self.stdout.write(f'Пересчитано авторов: {authors}, групп: {groups}, '
+                          f'постов: {posts}')
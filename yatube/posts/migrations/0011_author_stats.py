@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.functions
+import django.db.models.deletion
+
+
+def count_group_posts(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.filter(group=models.OuterRef('pk')).order_by()
+    Group.objects.update(posts_count=models.functions.Coalesce(
+        models.Subquery(posts.values('group').annotate(
+            n=models.Count('pk')).values('n')),
+        0,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='число постов')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='число комментариев')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='число подписок')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='число постов'),
+        ),
+        migrations.RunPython(count_group_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails',
+            field=models.TextField(blank=True, editable=False, help_text='JSON: имя размера из POSTS_THUMBNAILS -> URL', verbose_name='готовые миниатюры'),
+        ),
+    ]
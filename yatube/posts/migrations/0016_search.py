@@ -0,0 +1,71 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:46
+
+from collections import Counter
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+from posts.stemmer import stems
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    """Создать индекс FTS5 и заполнить поисковый индекс.
+
+    Без FTS5 индекс хранится в SearchTerm, созданной выше.
+    """
+    connection = schema_editor.connection
+    fts = False
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+                "body, tokenize='unicode61 remove_diacritics 0')"
+            )
+            fts = True
+        except OperationalError:
+            pass
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    for post in Post.objects.only('text').iterator(chunk_size=1000):
+        terms = [term[:64] for term in stems(post.text)]
+        if fts:
+            schema_editor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [post.pk, ' '.join(terms)],
+            )
+        else:
+            SearchTerm.objects.bulk_create(
+                SearchTerm(term=term, post_id=post.pk, count=count)
+                for term, count in Counter(terms).items()
+            )
+
+
+def drop_fts_table(apps, schema_editor):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_comment_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='основа слова')),
+                ('count', models.PositiveSmallIntegerField(default=1, verbose_name='число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='пост')),
+            ],
+            options={
+                'verbose_name': 'Слово поиска',
+                'verbose_name_plural': 'Слова поиска',
+                'unique_together': {('term', 'post')},
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
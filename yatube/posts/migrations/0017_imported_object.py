@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedObject',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=200, verbose_name='источник')),
+                ('model', models.CharField(max_length=20, verbose_name='модель')),
+                ('old_id', models.PositiveIntegerField(verbose_name='id в источнике')),
+                ('new_id', models.PositiveIntegerField(verbose_name='id в базе')),
+            ],
+            options={
+                'verbose_name': 'Импортированный объект',
+                'verbose_name_plural': 'Импортированные объекты',
+                'unique_together': {('source', 'model', 'old_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='celebrity_since',
+            field=models.DateTimeField(blank=True, help_text='Когда подписчиков стало больше FEED_FANOUT_LIMIT (см. posts/feed.py)', null=True, verbose_name='читается на лету с'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:47
+
+from django.db import migrations, models
+import django.db.models.functions
+
+
+def count_post_comments(apps, schema_editor):
+    for post_model, comment_model in (('Post', 'Comment'),
+                                      ('ArchivedPost', 'ArchivedComment')):
+        Post = apps.get_model('posts', post_model)
+        Comment = apps.get_model('posts', comment_model)
+        comments = Comment.objects.filter(
+            post=models.OuterRef('pk')).order_by()
+        Post.objects.update(
+            comments_count=models.functions.Coalesce(
+                models.Subquery(comments.values('post').annotate(
+                    n=models.Count('pk')).values('n')),
+                0,
+            ),
+            comments_changed=models.Subquery(comments.values('post').annotate(
+                last=models.Max('created')).values('last')),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_author_celebrity_since'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='comments_changed',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='комментарии изменены'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='число комментариев'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_changed',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='комментарии изменены'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='число комментариев'),
+        ),
+        migrations.RunPython(count_post_comments, migrations.RunPython.noop),
+    ]
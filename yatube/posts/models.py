@@ -1,12 +1,34 @@
-from django.db import models
+import json
+
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
 
+class CountedModel(models.Model):
+    """Модель, сохранение которой меняет счётчики AuthorStats и Group.
+
+    Сигналы post_save срабатывают внутри той же транзакции, что и INSERT,
+    поэтому строка и счётчики фиксируются вместе.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="число постов",
+    )
 
     def __str__(self):
         return (self.title)
@@ -16,10 +38,28 @@ class Group(models.Model):
         verbose_name_plural = "Группы"
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    LIST_FIELDS = (
+        'text', 'pub_date', 'updated', 'image', 'thumbnails',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__title', 'group__slug',
+    )
+
+    def for_list(self):
+        """Посты с автором и группой в одном запросе.
+
+        Выбираются только колонки, которые выводят карточки постов,
+        поэтому страница из N постов не делает N дополнительных запросов.
+        """
+        return self.select_related('author', 'group').only(*self.LIST_FIELDS)
+
+
+class Post(CountedModel):
     text = models.TextField(verbose_name="текст поста")
     pub_date = models.DateTimeField(auto_now_add=True,
                                     verbose_name="дата публикации")
+    updated = models.DateTimeField(auto_now=True,
+                                   verbose_name="дата изменения")
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -38,17 +78,60 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnails = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name="готовые миниатюры",
+        help_text="JSON: имя размера из POSTS_THUMBNAILS -> URL",
+    )
+    # Валидаторы страницы поста (posts/conditional.py) читают эти поля
+    # вместо COUNT и MAX по комментариям; их двигают сигналы Comment.
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="число комментариев")
+    comments_changed = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        verbose_name="комментарии изменены")
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # Списки постов фильтруют по группе или автору и сортируют по
+        # (-pub_date, -id), так что страница читается диапазоном индекса.
+        indexes = [
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+        ]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def thumbnail_urls(self):
+        """URL заранее нарезанных миниатюр; пусто, пока задача в работе."""
+        try:
+            urls = json.loads(self.thumbnails)
+        except ValueError:
+            return {}
+        return urls if isinstance(urls, dict) else {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Автор и группа на момент загрузки: при их смене в post_save
+        # счётчик переносится со старых значений на новые.
+        instance._loaded_counters = (instance.__dict__.get('author_id'),
+                                     instance.__dict__.get('group_id'))
+        return instance
+
 
-class Comment(models.Model):
+class Comment(CountedModel):
     post = models.ForeignKey(Post,
                              on_delete=models.CASCADE,
                              related_name='comments',
@@ -64,8 +147,15 @@ class Comment(models.Model):
     created = models.DateTimeField(auto_now_add=True,
                                    verbose_name="дата комментария")
 
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
+
 
-class Follow(models.Model):
+class Follow(CountedModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -80,7 +170,209 @@ class Follow(models.Model):
     )
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='follow_user_author_unique'),
+        ]
         verbose_name = 'Подписка'
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора.
+
+    Обновляются сигналами при создании и удалении Post, Comment и Follow;
+    команда `recount` пересчитывает их с нуля.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name="автор",
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name="число постов")
+    comments_count = models.PositiveIntegerField(
+        default=0, verbose_name="число комментариев")
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name="число подписчиков")
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name="число подписок")
+    celebrity_since = models.DateTimeField(
+        null=True, blank=True,
+        verbose_name="читается на лету с",
+        help_text='Когда подписчиков стало больше FEED_FANOUT_LIMIT '
+                  '(см. posts/feed.py)',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'Статистика {self.user_id}'
+
+
+class FeedEntry(models.Model):
+    """Запись материализованной ленты подписок.
+
+    Заполняется при публикации поста (fan-out-on-write) и при подписке,
+    поэтому страница `/follow/` читает ленту одним диапазоном по индексу
+    `(user, -pub_date, -post)` вместо соединения Post, User и Follow.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name="читатель",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name="пост",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="автор",
+    )
+    pub_date = models.DateTimeField(verbose_name="дата публикации")
+
+    class Meta:
+        ordering = ['-pub_date']
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='feed_user_pub_date_post_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_user_author_idx'),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self):
+        return f'{self.post_id} в ленте {self.user_id}'
+
+
+class SearchTerm(models.Model):
+    """Обратный индекс поиска, если в SQLite нет FTS5 (см. posts.search)."""
+    term = models.CharField(max_length=64, verbose_name="основа слова")
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="пост",
+    )
+    count = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name="число вхождений",
+    )
+
+    class Meta:
+        unique_together = ('term', 'post')
+        verbose_name = 'Слово поиска'
+        verbose_name_plural = 'Слова поиска'
+
+    def __str__(self):
+        return f'{self.term} в посте {self.post_id}'
+
+
+class ImportedObject(models.Model):
+    """Соответствие id из файла импорта и id в базе (см. posts.transfer).
+
+    По нему импорт переставляет внешние ключи и при повторном запуске
+    пропускает уже загруженные строки.
+    """
+    source = models.CharField(max_length=200, verbose_name="источник")
+    model = models.CharField(max_length=20, verbose_name="модель")
+    old_id = models.PositiveIntegerField(verbose_name="id в источнике")
+    new_id = models.PositiveIntegerField(verbose_name="id в базе")
+
+    class Meta:
+        unique_together = ('source', 'model', 'old_id')
+        verbose_name = 'Импортированный объект'
+        verbose_name_plural = 'Импортированные объекты'
+
+    def __str__(self):
+        return f'{self.model} {self.old_id} -> {self.new_id}'
+
+
+class ArchivedPost(models.Model):
+    """Пост, перенесённый из Post командой `archive_posts`.
+
+    Сохраняет id поста, поэтому ссылки на него продолжают работать:
+    страница поста и профиль ищут пост здесь, если его нет в Post.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name="текст поста")
+    pub_date = models.DateTimeField(verbose_name="дата публикации")
+    updated = models.DateTimeField(verbose_name="дата изменения")
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name="автор",
+    )
+    group = models.ForeignKey(Group,
+                              blank=True,
+                              null=True,
+                              on_delete=models.SET_NULL,
+                              related_name='archived_posts',
+                              verbose_name="Группа",
+                              )
+    image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+    thumbnails = models.TextField(blank=True,
+                                  verbose_name="готовые миниатюры")
+    comments_count = models.PositiveIntegerField(
+        default=0, verbose_name="число комментариев")
+    comments_changed = models.DateTimeField(
+        null=True, blank=True, verbose_name="комментарии изменены")
+    archived = models.DateTimeField(auto_now_add=True,
+                                    verbose_name="дата архивации")
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='archived_post_group_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='archived_post_author_idx'),
+        ]
+        verbose_name = "Архивный пост"
+        verbose_name_plural = "Архивные посты"
+
+    def __str__(self):
+        return self.text[:15]
+
+    thumbnail_urls = Post.thumbnail_urls
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(ArchivedPost,
+                             on_delete=models.CASCADE,
+                             related_name='comments',
+                             verbose_name="Пост",
+                             )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name="автор",
+    )
+    text = models.TextField(verbose_name="текст комментария")
+    created = models.DateTimeField(verbose_name="дата комментария")
+
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='archived_comment_post_idx'),
+        ]
@@ -0,0 +1,195 @@
+"""Keyset-пагинация по полям сортировки queryset.
+
+Вместо `COUNT(*)` и `OFFSET n` страница выбирается условием
+`(pub_date, id) < (курсор)` и читает из индекса ровно `per_page + 1`
+строк, поэтому стоимость сотой и первой страницы одинакова.
+"""
+import base64
+import heapq
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorPaginator(Paginator):
+    """Paginator, листающий queryset курсорами `after`/`before`.
+
+    Ключ курсора — поля сортировки queryset (по умолчанию `ordering`
+    модели) с добавленным первичным ключом для однозначности. Все поля
+    должны сортироваться в одном направлении. Вместо первичного ключа
+    можно сортировать по аннотации со ссылкой на ту же запись, например
+    `F('feed_entries__post')`: тогда сортировка целиком берётся из
+    индекса связанной таблицы.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.keys, self.descending = self._get_keys(object_list)
+        self.has_next = self.has_previous = False
+        self.next_cursor = self.previous_cursor = None
+
+    @staticmethod
+    def _get_keys(queryset):
+        ordering = list(queryset.query.order_by
+                        or queryset.model._meta.ordering)
+        if not ordering:
+            ordering = ['-pk']
+        descending = ordering[0].startswith('-')
+        keys = []
+        for name in ordering:
+            if name.startswith('-') != descending:
+                raise ValueError(
+                    'Курсорная пагинация требует одного направления '
+                    'сортировки для всех полей'
+                )
+            keys.append(name.lstrip('-'))
+        pk_name = queryset.model._meta.pk.name
+        if not any(key in ('pk', pk_name)
+                   or CursorPaginator._is_pk_alias(queryset, key)
+                   for key in keys):
+            keys.append('pk')
+        return keys, descending
+
+    @staticmethod
+    def _is_pk_alias(queryset, name):
+        """Аннотация — внешний ключ, по которому присоединена эта запись."""
+        target = getattr(queryset.query.annotations.get(name), 'target', None)
+        return (target is not None and target.is_relation
+                and target.related_model is queryset.model)
+
+    def _output_field(self, name):
+        query = self.object_list.query
+        if name in query.annotations:
+            return query.annotations[name].output_field
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode_cursor(self, obj):
+        values = [getattr(obj, key) for key in self.keys]
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value
+                  for value in values]
+        data = json.dumps(values).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Значения ключей из курсора; подделанный курсор — InvalidCursor."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded))
+            if (not isinstance(values, list)
+                    or len(values) != len(self.keys)):
+                raise InvalidCursor(cursor)
+            values = [self._output_field(key).to_python(value)
+                      for key, value in zip(self.keys, values)]
+        except (TypeError, ValueError, ValidationError) as error:
+            raise InvalidCursor(cursor) from error
+        # NULL в курсоре не бывает, а в условии _seek он не сравним.
+        if any(value is None for value in values):
+            raise InvalidCursor(cursor)
+        return values
+
+    def _seek(self, values, forward):
+        """Условие «строго после курсора» в порядке обхода."""
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            step = Q(**{f'{key}__{lookup}': values[i]})
+            for prev_key, prev_value in zip(self.keys[:i], values[:i]):
+                step &= Q(**{prev_key: prev_value})
+            condition |= step
+        return condition
+
+    def _ordering(self, forward):
+        prefix = '-' if self.descending == forward else ''
+        return [prefix + key for key in self.keys]
+
+    def _fetch(self, queryset, values, forward):
+        """Первые per_page + 1 объектов после курсора в порядке обхода."""
+        queryset = queryset.order_by(*self._ordering(forward))
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward))
+        return list(queryset[:self.per_page + 1])
+
+    def _rows(self, values, forward):
+        return self._fetch(self.object_list, values, forward)
+
+    def cursor_page(self, after=None, before=None):
+        forward = before is None
+        cursor = after if forward else before
+        values = self.decode_cursor(cursor) if cursor else None
+        objects = self._rows(values, forward)
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if forward:
+            self.has_next, self.has_previous = has_more, bool(cursor)
+        else:
+            objects.reverse()
+            self.has_next, self.has_previous = True, has_more
+        self.next_cursor = self.previous_cursor = None
+        if objects and self.has_next:
+            self.next_cursor = self.encode_cursor(objects[-1])
+        if objects and self.has_previous:
+            self.previous_cursor = self.encode_cursor(objects[0])
+        return self._get_page(objects, 2 if self.has_previous else 1, self)
+
+    def get_page(self, after=None, before=None):
+        """Страница по курсору; при испорченном курсоре — первая."""
+        try:
+            return self.cursor_page(after=after, before=before)
+        except InvalidCursor:
+            return self.cursor_page()
+
+    def get_state(self, page):
+        """Всё, что нужно для восстановления страницы без запросов."""
+        return (list(page.object_list), self.has_next, self.has_previous,
+                self.next_cursor, self.previous_cursor)
+
+    def restore_page(self, state):
+        objects, self.has_next, self.has_previous = state[:3]
+        self.next_cursor, self.previous_cursor = state[3:]
+        return self._get_page(objects, 2 if self.has_previous else 1, self)
+
+    @property
+    def num_pages(self):
+        """Число страниц в окне «предыдущая — текущая — следующая».
+
+        Общее число страниц курсорному пагинатору неизвестно, поэтому
+        `Page.has_next()` и `has_previous()` работают от номера текущей
+        страницы в этом окне, а не от `COUNT(*)`.
+        """
+        current = 2 if self.has_previous else 1
+        return current + 1 if self.has_next else current
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """CursorPaginator по нескольким querysets с общей сортировкой.
+
+    Например, посты автора из Post и ArchivedPost: страница читает
+    до `per_page + 1` строк из каждого queryset и сливает их, поэтому
+    записи могут перемежаться как угодно. Первичные ключи querysets
+    не должны пересекаться.
+    """
+
+    def __init__(self, querysets, per_page, **kwargs):
+        super().__init__(querysets[0], per_page, **kwargs)
+        self.querysets = querysets
+
+    def _sort_key(self, obj):
+        return tuple(getattr(obj, key) for key in self.keys)
+
+    def _rows(self, values, forward):
+        merged = heapq.merge(
+            *(self._fetch(queryset, values, forward)
+              for queryset in self.querysets),
+            key=self._sort_key, reverse=self.descending == forward,
+        )
+        return list(islice(merged, self.per_page + 1))
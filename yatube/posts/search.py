@@ -0,0 +1,183 @@
+"""Полнотекстовый поиск по постам.
+
+Текст поста и запрос проходят через русский стеммер, а обратный индекс
+по основам хранится в виртуальной таблице SQLite FTS5 `posts_post_fts`
+(rowid = id поста, ранжирование bm25). Если FTS5 недоступен, таблица
+не создаётся миграцией, и тот же интерфейс работает поверх обычной
+таблицы `SearchTerm` с составным индексом `(term, post)`.
+Индекс обновляется сигналами при сохранении и удалении поста.
+"""
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.expressions import RawSQL
+
+from .models import Post, SearchTerm
+from .stemmer import stems
+
+FTS_TABLE = 'posts_post_fts'
+
+
+class RawSubquery(RawSQL):
+    """RawSQL без своих скобок: в `IN ((...))` SQLite видит скаляр."""
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def terms_of(text):
+    """Основы слов текста; слишком длинные обрезаются по длине столбца."""
+    max_length = SearchTerm._meta.get_field('term').max_length
+    return [term[:max_length] for term in stems(text)]
+
+
+def query_terms(query):
+    """Уникальные основы слов запроса в исходном порядке."""
+    return list(dict.fromkeys(terms_of(query)))
+
+
+class FtsIndex:
+    """Индекс в виртуальной таблице FTS5."""
+
+    def index(self, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post_id])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [post_id, ' '.join(terms_of(text))],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post_id])
+
+    @staticmethod
+    def _match(terms):
+        return ' '.join('"{}"'.format(term.replace('"', '""'))
+                        for term in terms)
+
+    def ids(self, terms, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                [self._match(terms), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, terms):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self._match(terms)],
+            )
+            return cursor.fetchone()[0]
+
+    def subquery(self, terms):
+        return RawSubquery(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [self._match(terms)],
+        )
+
+
+class TermIndex:
+    """Индекс в таблице SearchTerm, если FTS5 нет."""
+
+    def index(self, post_id, text):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post_id=post_id, count=count)
+            for term, count in Counter(terms_of(text)).items()
+        )
+
+    def remove(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    @staticmethod
+    def _matches(terms):
+        # Пост подходит, если в нём есть все основы запроса.
+        return (
+            SearchTerm.objects.filter(term__in=terms)
+            .values('post')
+            .annotate(matched=Count('term'), score=Sum('count'))
+            .filter(matched=len(terms))
+        )
+
+    def ids(self, terms, offset, limit):
+        matches = self._matches(terms).order_by('-score', '-post')
+        return list(matches.values_list('post', flat=True)
+                    [offset:offset + limit])
+
+    def count(self, terms):
+        return self._matches(terms).count()
+
+    def subquery(self, terms):
+        return self._matches(terms).values('post')
+
+
+def get_index():
+    # Таблица FTS5 создаётся миграцией только там, где он есть.
+    if not hasattr(connection, 'posts_search_index'):
+        tables = connection.introspection.table_names()
+        connection.posts_search_index = (
+            FtsIndex() if FTS_TABLE in tables else TermIndex())
+    return connection.posts_search_index
+
+
+def index_post(post):
+    get_index().index(post.pk, post.text)
+
+
+def remove_post(post_id):
+    get_index().remove(post_id)
+
+
+def rebuild(batch_size=1000):
+    """Переиндексировать все посты; возвращает их число."""
+    index = get_index()
+    total = 0
+    for post in Post.objects.only('text').iterator(chunk_size=batch_size):
+        index.index(post.pk, post.text)
+        total += 1
+    return total
+
+
+def filter_posts(queryset, query):
+    """Посты queryset, содержащие все слова запроса, без ранжирования."""
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none()
+    return queryset.filter(pk__in=get_index().subquery(terms))
+
+
+class SearchResults:
+    """Ранжированная выдача для Paginator: `count()` и срезы постов."""
+
+    def __init__(self, query, queryset=None):
+        self.terms = query_terms(query)
+        self.queryset = Post.objects.for_list() if queryset is None else (
+            queryset)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = (get_index().count(self.terms)
+                           if self.terms else 0)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if not self.terms:
+            return []
+        offset = key.start or 0
+        ids = get_index().ids(self.terms, offset, key.stop - offset)
+        posts = self.queryset.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
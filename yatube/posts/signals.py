@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, counters, feed, search, tasks
+from .models import Comment, Follow, Group, Post, User
+
+# Поля пользователя, которые выводят карточки постов.
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_post_pages(sender, **kwargs):
+    transaction.on_commit(cache.bump_version)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(sender, instance, created, update_fields,
+                            **kwargs):
+    # Кэш страниц хранит посты вместе с авторами. Новому пользователю
+    # нечего сбрасывать, а вход меняет только last_login.
+    if created or (update_fields and not AUTHOR_FIELDS & update_fields):
+        return
+    transaction.on_commit(cache.bump_version)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    current = (instance.author_id, instance.group_id)
+    if created:
+        counters.bump_author(instance.author_id, 'posts_count', 1,
+                             create=True)
+        counters.bump_group(instance.group_id, 1)
+    else:
+        author_id, group_id = getattr(instance, '_loaded_counters', current)
+        if author_id != instance.author_id:
+            counters.bump_author(author_id, 'posts_count', -1)
+            counters.bump_author(instance.author_id, 'posts_count', 1,
+                                 create=True)
+        if group_id != instance.group_id:
+            counters.bump_group(group_id, -1)
+            counters.bump_group(instance.group_id, 1)
+    instance._loaded_counters = current
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    if counters.is_frozen():
+        return
+    counters.bump_author(instance.author_id, 'posts_count', -1)
+    counters.bump_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.bump_author(instance.author_id, 'comments_count', 1,
+                             create=True)
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    if counters.is_frozen():
+        return
+    counters.bump_author(instance.author_id, 'comments_count', -1)
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.bump_author(instance.author_id, 'followers_count', 1,
+                             create=True)
+        counters.bump_author(instance.user_id, 'following_count', 1,
+                             create=True)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, 'followers_count', -1)
+    counters.bump_author(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        tasks.schedule_fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_feed_on_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        tasks.schedule_feed_fill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_feed_on_unfollow(sender, instance, **kwargs):
+    feed.remove_author_from_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def mark_celebrity_on_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        feed.mark_celebrity(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def refill_feeds_below_limit(sender, instance, **kwargs):
+    # Посты, написанные, пока подписчиков было больше лимита, читались
+    # на лету; теперь их нужно разложить по лентам.
+    if feed.needs_refill(instance.author_id):
+        tasks.schedule_author_refill(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw, **kwargs):
+    if not raw:
+        tasks.schedule_indexing(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
@@ -0,0 +1,148 @@
+"""Стеммер Портера (Snowball) для русского языка.
+
+Чистый Python без зависимостей: поиск по постам приводит слова текста
+и запроса к одной основе, чтобы «книги» находились по запросу «книга».
+Алгоритм: https://snowballstem.org/algorithms/russian/stemmer.html
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+# Окончания, перед которыми требуется «а» или «я», и остальные.
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+ADJECTIVE = ((), (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+))
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = ((), (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+))
+DERIVATIONAL = ('ость', 'ост')
+SUPERLATIVE = ('ейше', 'ейш')
+
+WORD_RE = re.compile(r'\w+')
+
+
+def _endings(groups):
+    after_a, plain = groups
+    endings = [(ending, True) for ending in after_a]
+    endings += [(ending, False) for ending in plain]
+    return sorted(endings, key=lambda item: -len(item[0]))
+
+
+_PERFECTIVE_GERUND = _endings(PERFECTIVE_GERUND)
+_REFLEXIVE = _endings(REFLEXIVE)
+_ADJECTIVE = _endings(ADJECTIVE)
+_PARTICIPLE = _endings(PARTICIPLE)
+_VERB = _endings(VERB)
+_NOUN = _endings(NOUN)
+
+
+def _remove(rv, endings):
+    """`rv` без самого длинного подходящего окончания или None.
+
+    Как в Snowball, если самое длинное окончание требует «а»/«я» перед
+    собой, а их нет, более короткие окончания уже не проверяются.
+    """
+    for ending, after_a in endings:
+        if rv.endswith(ending):
+            rest = rv[:-len(ending)]
+            if after_a and not rest.endswith(('а', 'я')):
+                return None
+            return rest
+    return None
+
+
+def _regions(word):
+    """Начала областей RV и R2."""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _adjectival(rv):
+    rest = _remove(rv, _ADJECTIVE)
+    if rest is None:
+        return None
+    without_participle = _remove(rest, _PARTICIPLE)
+    return rest if without_participle is None else without_participle
+
+
+def _strip_ending(rv):
+    """Шаг 1: деепричастие или возвратность и прилагательное, глагол,
+    существительное."""
+    rest = _remove(rv, _PERFECTIVE_GERUND)
+    if rest is not None:
+        return rest
+    rest = _remove(rv, _REFLEXIVE)
+    rv = rv if rest is None else rest
+    for step in (_adjectival,
+                 lambda rv: _remove(rv, _VERB),
+                 lambda rv: _remove(rv, _NOUN)):
+        rest = step(rv)
+        if rest is not None:
+            return rest
+    return rv
+
+
+def _tidy_up(rv):
+    """Шаг 4: превосходная степень, двойное «н» и мягкий знак."""
+    superlative = next(
+        (ending for ending in SUPERLATIVE if rv.endswith(ending)), None)
+    if superlative:
+        rv = rv[:-len(superlative)]
+    if rv.endswith('нн'):
+        return rv[:-1]
+    if rv.endswith('ь') and not superlative:
+        return rv[:-1]
+    return rv
+
+
+def stem(word):
+    """Основа русского слова; прочие слова — в нижнем регистре."""
+    word = word.lower().replace('ё', 'е')
+    rv_start, r2_start = _regions(word)
+    head, rv = word[:rv_start], word[rv_start:]
+    rv = _strip_ending(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    for ending in DERIVATIONAL:
+        if (rv.endswith(ending)
+                and len(head) + len(rv) - len(ending) >= r2_start):
+            rv = rv[:-len(ending)]
+            break
+    return head + _tidy_up(rv)
+
+
+def stems(text):
+    """Основы всех слов текста по порядку."""
+    return [stem(word) for word in WORD_RE.findall(text)]
@@ -0,0 +1,52 @@
+"""Фоновые задачи постов: раскладка по лентам и поисковый индекс.
+
+Задачи получают id и сами читают свежие данные: к моменту выполнения
+пост могли изменить или удалить. Нарезка миниатюр — в thumbnails.py.
+"""
+from core.jobs import enqueue, task
+
+from . import feed, search
+from .models import Follow, Post
+
+
+@task
+def fan_out_post(post_id):
+    post = Post.objects.only('author', 'pub_date').filter(pk=post_id).first()
+    if post is not None:
+        feed.fan_out_post(post)
+
+
+@task
+def fill_feed(user_id, author_id):
+    # Пока задача ждала, пользователь мог отписаться.
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        feed.add_author_to_feed(user_id, author_id)
+
+
+@task
+def refill_author(author_id):
+    feed.refill_author(author_id)
+
+
+@task
+def index_post(post_id):
+    post = Post.objects.only('text').filter(pk=post_id).first()
+    if post is not None:
+        search.index_post(post)
+
+
+def schedule_fan_out(post):
+    enqueue(fan_out_post, post.pk, key=f'fan-out:{post.pk}')
+
+
+def schedule_feed_fill(follow):
+    enqueue(fill_feed, follow.user_id, follow.author_id,
+            key=f'feed:{follow.user_id}:{follow.author_id}')
+
+
+def schedule_author_refill(author_id):
+    enqueue(refill_author, author_id, key=f'feed-refill:{author_id}')
+
+
+def schedule_indexing(post):
+    enqueue(index_post, post.pk, key=f'search:{post.pk}')
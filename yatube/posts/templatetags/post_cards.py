@@ -0,0 +1,47 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def card_key(post, show_author_link):
+    version = post.updated.timestamp() if post.updated else 0
+    # Карточка выводит имя автора и ссылку на группу: их смена тоже
+    # даёт новый ключ, хотя сам пост не менялся.
+    author, group = post.author, post.group
+    shown = (author.username, author.first_name, author.last_name,
+             group and (group.slug, group.title))
+    digest = hashlib.md5(repr(shown).encode()).hexdigest()
+    return (f'posts:card:{int(show_author_link)}:{post.pk}:{version}:'
+            f'{digest}')
+
+
+@register.simple_tag
+def post_cards(posts, show_author_link=True):
+    """Карточки постов страницы из кэша фрагментов.
+
+    Все карточки страницы читаются одним `get_many`, недостающие
+    рендерятся и записываются одним `set_many`. Ключ включает время
+    изменения поста, имя автора и группу, поэтому правка поста
+    сбрасывает только его карточку.
+    """
+    keys = {card_key(post, show_author_link): post for post in posts}
+    cards = cache.get_many(keys)
+    missing = {
+        key: render_to_string(CARD_TEMPLATE, {
+            'post': post,
+            'show_author_link': show_author_link,
+        })
+        for key, post in keys.items() if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, settings.POSTS_CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import counters
+from ..archive import archive_posts
+from ..models import (ArchivedComment, ArchivedPost, Comment, FeedEntry,
+                      Follow, Group, Post, User)
+
+
+class ArchiveTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        now = timezone.now()
+        cls.posts = []
+        for age in range(15):
+            pub_date = now - timedelta(days=100 * age)
+            post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text=f'Пост {age}')
+            Post.objects.filter(pk=post.pk).update(pub_date=pub_date)
+            FeedEntry.objects.update_or_create(
+                user=cls.reader, post=post,
+                defaults={'author': cls.author, 'pub_date': pub_date})
+            cls.posts.append(post)
+        cls.old = cls.posts[4]
+        cls.comment = Comment.objects.create(
+            post=cls.old, author=cls.reader, text='Старый комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_old_posts_moved(self):
+        """Старые посты переносятся с комментариями и прежними id."""
+        self.assertEqual(archive_posts(days=365, batch_size=3), (11, 1))
+        self.assertEqual(set(Post.objects.values_list('pk', flat=True)),
+                         {post.pk for post in self.posts[:4]})
+        self.assertTrue(ArchivedPost.objects.filter(
+            pk=self.old.pk, text=self.old.text).exists())
+        self.assertTrue(ArchivedComment.objects.filter(
+            pk=self.comment.pk, post_id=self.old.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(FeedEntry.objects.count(), 4)
+        self.assertEqual(archive_posts(days=365), (0, 0))
+
+    def test_counters_kept(self):
+        """Архивные посты и комментарии остаются в счётчиках."""
+        archive_posts(days=365)
+        self.assertEqual(counters.get_stats(self.author).posts_count, 15)
+        self.assertEqual(counters.get_stats(self.reader).comments_count, 1)
+        counters.recount_authors()
+        counters.recount_groups()
+        self.assertEqual(counters.get_stats(self.author).posts_count, 15)
+        self.assertEqual(counters.get_stats(self.reader).comments_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 15)
+
+    def test_archived_post_detail(self):
+        """Страница архивного поста открывается без формы комментария."""
+        archive_posts(days=365)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(list(response.context['comments']),
+                         list(ArchivedComment.objects.all()))
+        self.assertNotContains(
+            response, reverse('posts:add_comment', args=[self.old.pk]))
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.old.pk]),
+            {'text': 'Новый комментарий'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_profile_continues_into_archive(self):
+        """Профиль и группа после свежих постов листают архивные."""
+        archive_posts(days=365)
+        expected = [post.pk for post in self.posts]
+        for url in (reverse('posts:profile', args=['author']),
+                    reverse('posts:group_list', args=['group'])):
+            with self.subTest(url=url):
+                pks, params = [], {}
+                while True:
+                    page = self.client.get(url, params).context['page_obj']
+                    pks.extend(post.pk for post in page)
+                    if not page.paginator.has_next:
+                        break
+                    params = {'after': page.paginator.next_cursor}
+                self.assertEqual(pks, expected)
@@ -1,19 +1,39 @@
 import shutil
+import struct
 import tempfile
+import zlib
+from io import BytesIO
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
+
+from .. import cache
 from ..models import Post, Group
 from ..forms import PostForm
+from ..thumbnails import generate_thumbnails
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 User = get_user_model()
 
 
+def png_chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+def png_bomb(width, height):
+    """Крошечный PNG, в заголовке которого заявлено width x height."""
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', header)
+            + png_chunk(b'IDAT', zlib.compress(b'\0' * 1024))
+            + png_chunk(b'IEND', b''))
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostFormsTest(TestCase):
     @classmethod
@@ -115,3 +135,79 @@ class PostFormsTest(TestCase):
             id=self.post.pk,
             group=None
         ).exists())
+
+    def test_thumbnails_are_pregenerated(self):
+        """Миниатюры режутся заранее, а шаблон берёт готовый URL."""
+        generate_thumbnails(self.post.pk)
+        self.post.refresh_from_db()
+        urls = self.post.thumbnail_urls
+        self.assertEqual(set(urls), set(settings.POSTS_THUMBNAILS))
+        response = self.author.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertContains(response, urls['detail'])
+
+    def test_thumbnails_reset_cached_pages(self):
+        """Нарезка сбрасывает кэш карточки и страниц с постом."""
+        version = cache.get_version()
+        updated = self.post.updated
+        generate_thumbnails(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated, updated)
+        self.assertGreater(cache.get_version(), version)
+
+    @override_settings(JOBS_EAGER=False)
+    def test_new_image_resets_thumbnails(self):
+        """Новая картинка сбрасывает миниатюры старой."""
+        Post.objects.filter(pk=self.post.pk).update(
+            thumbnails='{"card": "/media/old.jpg"}')
+        uploaded = SimpleUploadedFile(
+            name='new.gif',
+            content=self.uploaded.open().read(),
+            content_type='image/gif',
+        )
+        self.author.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Тестовый пост', 'image': uploaded},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail_urls, {})
+
+    def create_post_with(self, uploaded):
+        return self.author.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded},
+        )
+
+    def test_huge_resolution_is_rejected(self):
+        """Картинка с огромным разрешением отбрасывается по заголовку."""
+        post_count = Post.objects.count()
+        response = self.create_post_with(SimpleUploadedFile(
+            'bomb.png', png_bomb(20000, 20000), content_type='image/png'))
+        self.assertFormError(response, 'form', 'image',
+                             'Слишком большое разрешение картинки')
+        self.assertEqual(Post.objects.count(), post_count)
+
+    @override_settings(POSTS_IMAGE_MAX_BYTES=10)
+    def test_large_file_is_rejected(self):
+        """Файл больше POSTS_IMAGE_MAX_BYTES не сохраняется."""
+        post_count = Post.objects.count()
+        response = self.create_post_with(SimpleUploadedFile(
+            'small.gif', self.uploaded.open().read(),
+            content_type='image/gif'))
+        self.assertFormError(response, 'form', 'image',
+                             'Файл больше 10\xa0байт')
+        self.assertEqual(Post.objects.count(), post_count)
+
+    @override_settings(POSTS_IMAGE_MAX_SIDE=10)
+    def test_image_is_normalized(self):
+        """Большая картинка не в веб-формате перекодируется в JPEG."""
+        buffer = BytesIO()
+        Image.new('RGB', (40, 20), 'red').save(buffer, 'BMP')
+        self.create_post_with(SimpleUploadedFile(
+            'big.bmp', buffer.getvalue(), content_type='image/bmp'))
+        post = Post.objects.latest('pk')
+        generate_thumbnails(post.pk)
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (10, 5)))
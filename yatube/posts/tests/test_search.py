@@ -0,0 +1,91 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import FtsIndex, TermIndex, get_index, query_terms
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_stem(self):
+        """Слова приводятся к основам как в Snowball."""
+        words = {
+            'книги': 'книг',
+            'книгами': 'книг',
+            'важнейшие': 'важн',
+            'благодарности': 'благодарн',
+            'ввалились': 'ввал',
+            'бегавшая': 'бега',
+            'ёлки': 'елк',
+            'Django': 'django',
+        }
+        for word, expected in words.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.books = Post.objects.create(
+            author=cls.user, text='Читаю книги, книги и ещё раз книги')
+        cls.book = Post.objects.create(
+            author=cls.user, text='Купил новую книгу')
+        cls.other = Post.objects.create(
+            author=cls.user, text='Гулял по лесу')
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_inflected_forms_ranked(self):
+        """Ищутся все формы слова, частые упоминания выше."""
+        self.assertEqual(self.search('книга'), [self.books.pk, self.book.pk])
+
+    def test_all_words_required(self):
+        self.assertEqual(self.search('новые книжки'), [])
+        self.assertEqual(self.search('новая книга'), [self.book.pk])
+        self.assertEqual(self.search(''), [])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        other = Post.objects.get(pk=self.other.pk)
+        other.text = 'Гулял с книгой'
+        other.save()
+        self.assertIn(other.pk, self.search('книги'))
+        self.assertEqual(self.search('лес'), [])
+        Post.objects.get(pk=self.book.pk).delete()
+        self.assertNotIn(self.book.pk, self.search('книга'))
+
+    def test_term_index_fallback(self):
+        """Таблица SearchTerm отвечает так же, как FTS5."""
+        index = TermIndex()
+        for post in Post.objects.all():
+            index.index(post.pk, post.text)
+        terms = query_terms('книги')
+        self.assertEqual(index.ids(terms, 0, 10),
+                         [self.books.pk, self.book.pk])
+        self.assertEqual(index.count(terms), 2)
+
+    def test_admin_uses_index(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'книгами'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 есть только в SQLite')
+    def test_fts_is_used_when_available(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            options = {row[0] for row in cursor.fetchall()}
+        expected = FtsIndex if 'ENABLE_FTS5' in options else TermIndex
+        self.assertIsInstance(get_index(), expected)
@@ -0,0 +1,117 @@
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..archive import archive_posts
+from ..models import (ArchivedComment, ArchivedPost, Comment, FeedEntry,
+                      Follow, Group, ImportedObject, Post, User)
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост номер {i}')
+            for i in range(5)
+        ]
+        old = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=cls.posts[0].pk).update(pub_date=old)
+        Comment.objects.create(post=cls.posts[1], author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'content.ndjson.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def snapshot(self):
+        return {
+            'archived_posts': sorted(ArchivedPost.objects.values_list(
+                'author__username', 'group__slug', 'text', 'pub_date')),
+            'archived_comments': list(ArchivedComment.objects.values_list(
+                'post__text', 'author__username', 'text', 'created')),
+            'posts': sorted(Post.objects.values_list(
+                'author__username', 'group__slug', 'text', 'pub_date')),
+            'comments': list(Comment.objects.values_list(
+                'post__text', 'author__username', 'text', 'created')),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        }
+
+    def export_and_clear(self):
+        call_command('export_content', self.path, chunk_size=2,
+                     stderr=StringIO())
+        before = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        return before
+
+    def load(self, path=None, **options):
+        call_command('import_content', path or self.path, batch_size=2,
+                     stdout=StringIO(), **options)
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка в пустую базу сохраняют контент и даты."""
+        before = self.export_and_clear()
+        self.load()
+        self.assertEqual(self.snapshot(), before)
+        group = Group.objects.get(slug='group')
+        self.assertEqual(group.posts_count, 5)
+        reader = User.objects.get(username='reader')
+        self.assertEqual(FeedEntry.objects.filter(user=reader).count(), 5)
+
+    def test_archive_round_trip(self):
+        """Архивные посты и комментарии выгружаются и остаются в архиве."""
+        Comment.objects.create(post=self.posts[0], author=self.reader,
+                               text='Старый комментарий')
+        archive_posts(days=10)
+        self.assertEqual(ArchivedPost.objects.count(), 1)
+        before = self.export_and_clear()
+        self.load()
+        self.load()
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(Group.objects.get().posts_count, 5)
+        archived = ArchivedPost.objects.get()
+        self.assertFalse(Post.objects.filter(pk=archived.pk).exists())
+        new = Post.objects.create(author=archived.author, text='Новый')
+        self.assertGreater(new.pk, archived.pk)
+
+    def test_resume(self):
+        """Повторная и прерванная загрузки не создают дублей."""
+        before = self.export_and_clear()
+        with gzip.open(self.path, 'rt', encoding='utf-8') as source:
+            lines = source.readlines()
+        partial = os.path.join(self.tmp, 'partial.ndjson')
+        with open(partial, 'w', encoding='utf-8') as target:
+            target.writelines(lines[:5])
+        self.load(partial, source='content', no_rebuild=True)
+        self.assertEqual(Post.objects.count(), 2)
+        self.load(source='content')
+        self.load(source='content')
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(ImportedObject.objects.filter(
+            source='content', model='post').count(), 5)
+
+    def test_existing_users_matched(self):
+        """Пользователи с тем же именем не создаются заново."""
+        before = self.export_and_clear()
+        author = User.objects.create_user(username='author')
+        self.load()
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(author.posts.count(), 5)
+        self.assertEqual(self.snapshot(), before)
@@ -1,14 +1,27 @@
 from django.core.cache import cache
+from io import StringIO
+from itertools import count
+from random import Random
+from threading import Thread
 import shutil
 import tempfile
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase, override_settings
+from django.db import connection, transaction
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
-from ..models import Follow, Post, Group
+from unittest import skipUnless
+from .. import bench
+from ..models import AuthorStats, Comment, FeedEntry, Follow, Post, Group
 from ..forms import CommentForm, PostForm
+from ..paginators import CursorPaginator
+from ..views import COMMENTS_AMOUNT
+from .utils import QueryBudgetMixin, forged_cursor
 
 User = get_user_model()
 
@@ -143,6 +156,53 @@ class PostViewsTests(TestCase):
                 response = self.client.get(reverse_name + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), 3)
 
+    def test_cursor_paginator(self):
+        """Курсорные ссылки листают страницы без COUNT(*) и OFFSET."""
+        page_list = (
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+        for reverse_name in page_list:
+            with self.subTest(reverse_name=reverse_name):
+                first = self.client.get(reverse_name).context['page_obj']
+                self.assertEqual(len(first), 10)
+                self.assertFalse(first.has_previous())
+                after = first.paginator.next_cursor
+                with CaptureQueriesContext(connection) as queries:
+                    second = self.client.get(
+                        f'{reverse_name}?after={after}'
+                    ).context['page_obj']
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                sql = [query['sql'] for query in queries.captured_queries]
+                self.assertTrue(any('LIMIT 11' in query for query in sql))
+                self.assertFalse(any('OFFSET' in query for query in sql))
+                self.assertFalse(any('COUNT(' in query for query in sql))
+                before = second.paginator.previous_cursor
+                back = self.client.get(
+                    f'{reverse_name}?before={before}'
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                broken = self.client.get(f'{reverse_name}?after=broken')
+                self.assertEqual(
+                    list(broken.context['page_obj']), list(first))
+
+    def test_forged_cursor(self):
+        """Подделанный курсор открывает первую страницу, а не 500."""
+        first = list(self.client.get(
+            reverse('posts:index')).context['page_obj'])
+        for values in (['notadate', 'x'], [None, 1], {'a': 1}, [1]):
+            cursor = forged_cursor(values)
+            with self.subTest(values=values):
+                response = self.client.get(
+                    reverse('posts:index'), {'after': cursor})
+                self.assertEqual(list(response.context['page_obj']), first)
+                response = self.client.get(
+                    reverse('posts:post_comments', args=[self.post.pk]),
+                    {'after': cursor})
+                self.assertEqual(response.status_code, 200)
+
     def test_main_page_show_correct_context(self):
         """Шаблон index сформирован с правильным контекстом."""
         response = self.authorized_client.get(reverse('posts:index'))
@@ -298,3 +358,457 @@ class CommentFormTests(TestCase):
             author=CommentFormTests.author,
             text='Тестовый комментарий',
         ).exists())
+
+    def test_comments_are_paginated(self):
+        """post_detail выводит первую страницу, остальные — фрагментом."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text=f'к{i:02}')
+            for i in range(COMMENTS_AMOUNT + 5)
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        comments = response.context['comments']
+        self.assertEqual([c.text for c in comments][:2], ['к00', 'к01'])
+        self.assertEqual(len(comments), COMMENTS_AMOUNT)
+        self.assertContains(response, 'data-load-comments')
+
+        more = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'after': comments.paginator.next_cursor},
+        )
+        texts = [c.text for c in more.context['comments']]
+        rest = range(COMMENTS_AMOUNT, COMMENTS_AMOUNT + 5)
+        self.assertEqual(texts, [f'к{i:02}' for i in rest])
+        self.assertNotContains(more, 'data-load-comments')
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_new_post_is_fanned_out(self):
+        """Новый пост раскладывается в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='новый пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_copies_old_posts_and_unfollow_removes(self):
+        """Подписка копирует старые посты, отписка их убирает."""
+        post = Post.objects.create(author=self.author, text='старый пост')
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'author'}))
+        self.assertEqual(self.feed(), [post])
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}))
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_read_on_the_fly(self):
+        """Посты популярных авторов не копируются, а читаются на лету."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='пост звезды')
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed(), [post])
+
+    @override_settings(FEED_FANOUT_LIMIT=2, FEED_FANOUT_RESUME=1)
+    def test_feed_is_refilled_below_limit(self):
+        """Посты, написанные сверх лимита, раскладываются ниже порога."""
+        old = Post.objects.create(author=self.author, text='старый пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        others = [User.objects.create_user(username=f'other-{i}')
+                  for i in range(2)]
+        for other in others:
+            Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(author=self.author, text='пост звезды')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        # У лимита автор по-прежнему читается на лету.
+        Follow.objects.filter(user=others[0]).delete()
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, old])
+        FeedEntry.objects.filter(post=old).delete()
+        Follow.objects.filter(user=others[1]).delete()
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'post')),
+            [(self.reader.pk, post.pk)],
+        )
+        self.assertIsNone(AuthorStats.objects.get(
+            user=self.author).celebrity_since)
+
+    def test_backfill_feed_command(self):
+        """Команда backfill_feed восстанавливает ленты по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='пост')
+        FeedEntry.objects.all().delete()
+        call_command('backfill_feed', stdout=StringIO())
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'post')),
+            [(self.reader.pk, post.pk)],
+        )
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+        self.guests = count()
+
+    def add_posts(self, n):
+        for _ in range(n):
+            author = User.objects.create_user(
+                username=f'guest-{next(self.guests)}')
+            Post.objects.create(author=author, text='пост', group=self.group)
+            Post.objects.create(author=self.author, text='пост',
+                                group=self.group)
+
+    def test_post_lists_do_not_grow_with_posts(self):
+        """Списки постов не делают запрос на каждый пост."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                Post.objects.all().delete()
+                self.assertQueriesDoNotGrow(self.client, url, self.add_posts)
+
+    def test_post_detail_does_not_grow_with_comments(self):
+        """Комментарии выводятся без запроса на каждого автора."""
+        post = Post.objects.create(author=self.author, text='пост')
+
+        def add_comments(n):
+            for _ in range(n):
+                author = User.objects.create_user(
+                    username=f'guest-{next(self.guests)}')
+                Comment.objects.create(post=post, author=author, text='!')
+
+        self.assertQueriesDoNotGrow(
+            self.client,
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            add_comments,
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', 'план запроса SQLite')
+    def test_post_lists_use_indexes(self):
+        """Списки постов фильтруются и сортируются по индексам."""
+        self.add_posts(3)
+        post = Post.objects.filter(author=self.author).first()
+        Comment.objects.create(post=post, author=self.reader, text='!')
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:profile', kwargs={'username': 'author'})
+            + '?after=' + self.cursor_of(post),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            reverse('posts:profile_follow', kwargs={'username': 'author'}),
+        )
+        tables = ('posts_post', 'posts_comment', 'posts_follow',
+                  'posts_feedentry')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertUsesIndexes(self.client, url, tables)
+
+    @staticmethod
+    def cursor_of(post):
+        queryset = Post.objects.filter(author=post.author)
+        return CursorPaginator(queryset, 10).encode_cursor(post)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.post = Post.objects.create(author=cls.author, text='пост',
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+        )
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def assertChangeBreaks(self, change, urls):
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        change()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url), 304)
+
+    def test_new_comment_changes_post_detail(self):
+        self.assertChangeBreaks(
+            lambda: Comment.objects.create(post=self.post,
+                                           author=self.author, text='!'),
+            self.urls[:1],
+        )
+        last_modified = self.client.get(self.urls[0])['Last-Modified']
+        response = self.client.get(
+            self.urls[0], HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_deleted_comment_changes_post_detail(self):
+        comment = Comment.objects.create(post=self.post, author=self.author,
+                                         text='!')
+        self.assertChangeBreaks(comment.delete, self.urls[:1])
+
+    def test_post_validators_do_not_read_comments(self):
+        """304 для поста не зависит от длины обсуждения."""
+        etag = self.client.get(self.urls[0])['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.urls[0],
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('posts_comment' in query['sql']
+                             for query in queries.captured_queries))
+
+    def test_new_post_changes_lists(self):
+        self.assertChangeBreaks(
+            lambda: Post.objects.create(author=self.author, text='новый',
+                                        group=self.group),
+            self.urls,
+        )
+
+    def test_etag_depends_on_user(self):
+        """Авторизованный читатель не получает страницу гостя."""
+        client = Client()
+        client.force_login(self.author)
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+
+class BenchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Своя папка: общую TEMP_MEDIA_ROOT уже удалил PostViewsTests.
+        cls.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def test_seed_and_replay(self):
+        """Прогон на маленьком наборе данных проходит без ошибок."""
+        rng = Random(1)
+        bench.seed(users=5, groups=2, posts=30, comments=30, follows=8,
+                   images=1, rng=rng)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertTrue(FeedEntry.objects.exists())
+        report = bench.Replay(rng=rng).run(requests=40, warmup=0)
+        self.assertEqual(report['total']['requests'], 40)
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertEqual(set(report['views']) - set(bench.DEFAULT_MIX),
+                         set())
+
+
+# Все потоки приходят с одного IP, а проверяется не лимит, а запись.
+@override_settings(RATE_LIMITS_IP={})
+class ConcurrentWritesTests(TransactionTestCase):
+    THREADS = 8
+    COMMENTS = 10
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username='author'),
+            text='пост',
+        )
+        self.users = [User.objects.create_user(username=f'reader-{i}')
+                      for i in range(self.THREADS)]
+
+    def write_comments(self, user, errors):
+        client = Client()
+        client.force_login(user)
+        url = reverse('posts:add_comment', kwargs={'post_id': self.post.pk})
+        try:
+            for i in range(self.COMMENTS):
+                client.post(url, {'text': f'комментарий {i}'})
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    def read_then_write(self, user, errors):
+        try:
+            for i in range(self.COMMENTS):
+                with transaction.atomic():
+                    number = self.post.comments.count()
+                    Comment.objects.create(post=self.post, author=user,
+                                           text=f'№{number}')
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    def run_threads(self, target):
+        errors = []
+        threads = [Thread(target=target, args=(user, errors))
+                   for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_read_then_write_transactions_wait(self):
+        """Транзакция, начатая чтением, не падает при записи соседей."""
+        self.assertEqual(self.run_threads(self.read_then_write), [])
+        self.assertEqual(self.post.comments.count(),
+                         self.THREADS * self.COMMENTS)
+
+    def test_concurrent_comments_do_not_fail(self):
+        """Одновременные комментарии ждут очереди, а не падают."""
+        self.assertEqual(self.run_threads(self.write_comments), [])
+        self.assertEqual(self.post.comments.count(),
+                         self.THREADS * self.COMMENTS)
+
+
+class PostPageCacheTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(author=self.author, text='пост',
+                                        group=self.group)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+
+    def texts(self, url, client=None):
+        response = (client or self.client).get(url)
+        return [post.text for post in response.context['page_obj']]
+
+    def test_pages_are_cached_until_posts_change(self):
+        """Списки берутся из кэша и обновляются сразу после изменений."""
+        for url in self.urls:
+            self.assertEqual(self.texts(url), ['пост'])
+        Post.objects.filter(pk=self.post.pk).update(text='без сигнала')
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.texts(url), ['пост'])
+        self.post.refresh_from_db()
+        self.post.text = 'исправленный пост'
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.texts(url), ['исправленный пост'])
+
+    def test_author_and_group_changes_reach_cards(self):
+        """Новое имя автора и slug группы сразу видны на главной."""
+        self.client.get(self.urls[0])
+        self.author.first_name = 'Лев'
+        self.author.save()
+        self.group.slug = 'new-slug'
+        self.group.save()
+        response = self.client.get(self.urls[0])
+        self.assertContains(response, 'Автор: Лев')
+        self.assertContains(response, reverse(
+            'posts:group_list', kwargs={'slug': 'new-slug'}))
+        self.assertNotContains(response, reverse(
+            'posts:group_list', kwargs={'slug': 'test-slug'}))
+
+    def test_guest_and_user_share_cached_list(self):
+        """Гость и авторизованный пользователь читают одну запись кэша."""
+        self.client.get(self.urls[0])
+        user_client = Client()
+        user_client.force_login(self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.get(self.urls[0])
+        self.assertContains(response, 'Пользователь: author')
+        self.assertFalse(any('posts_post' in query['sql']
+                             for query in queries.captured_queries))
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.first = Post.objects.create(author=cls.author, text='первый')
+        cls.second = Post.objects.create(author=cls.author, text='второй')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+        self.url = reverse('posts:follow_index')
+
+    def test_cards_are_cached(self):
+        """Карточка берётся из кэша, пока пост не изменён."""
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.first.pk).update(text='без сигнала')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'первый')
+        self.assertNotContains(response, 'без сигнала')
+
+    def test_edit_invalidates_only_its_card(self):
+        """Правка поста сбрасывает только его карточку."""
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.second.pk).update(text='без сигнала')
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.first.pk}),
+            data={'text': 'отредактированный'},
+        )
+        response = self.client.get(self.url)
+        self.assertContains(response, 'отредактированный')
+        self.assertContains(response, 'второй')
@@ -0,0 +1,68 @@
+import base64
+import json
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def forged_cursor(values):
+    """Курсор с произвольными значениями, как его подделал бы клиент."""
+    data = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def count_queries(client, url):
+    """Число SQL-запросов, которые делает страница при пустом кэше."""
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    return len(context), response
+
+
+def query_plans(client, url):
+    """SQL каждого SELECT страницы и его план от EXPLAIN QUERY PLAN."""
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        client.get(url)
+    plans = []
+    with connection.cursor() as cursor:
+        for query in context.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+            plans.append((query['sql'], [row[-1] for row in cursor]))
+    return plans
+
+
+# Полный проход таблицы без индекса или сортировка во временном B-дереве.
+BAD_PLAN = re.compile(r'^SCAN (posts_\w+)$|TEMP B-TREE')
+
+
+class QueryBudgetMixin:
+    """Проверка, что число запросов страницы не растёт с числом объектов.
+
+    `add_objects(n)` должна создавать n новых объектов, которые попадут
+    на страницу `url`.
+    """
+
+    def assertQueriesDoNotGrow(self, client, url, add_objects, n=10):
+        add_objects(1)
+        expected, _ = count_queries(client, url)
+        add_objects(n - 1)
+        actual, response = count_queries(client, url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            actual, expected,
+            f'Страница {url} делает {expected} запросов с одним объектом '
+            f'и {actual} с {n}: похоже на N+1',
+        )
+
+    def assertUsesIndexes(self, client, url, tables):
+        """Запросы к `tables` читают индекс и не сортируют в памяти."""
+        for sql, plan in query_plans(client, url):
+            if not any(f'"{table}"' in sql for table in tables):
+                continue
+            bad = [step for step in plan if BAD_PLAN.search(step)]
+            self.assertEqual(bad, [], f'{url}: {sql}')
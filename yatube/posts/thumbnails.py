@@ -0,0 +1,90 @@
+"""Заблаговременная обработка картинок постов.
+
+После сохранения картинки фоновая задача перекодирует её в JPEG
+или PNG не больше `POSTS_IMAGE_MAX_SIDE`, если она больше или в другом
+формате, затем режет все размеры из `POSTS_THUMBNAILS` и записывает их
+URL в `Post.thumbnails`.
+Шаблоны берут готовый URL и только пока задача не выполнена падают
+обратно на ленивый `{% thumbnail %}`.
+"""
+import json
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from core.jobs import enqueue, task
+
+from . import cache
+from .models import Post
+
+
+def _encode(image):
+    """Уменьшить картинку и сохранить её в JPEG или, с прозрачностью, PNG."""
+    side = settings.POSTS_IMAGE_MAX_SIDE
+    image.draft('RGB', (side, side))
+    image.thumbnail((side, side))
+    transparent = (image.mode in ('RGBA', 'LA')
+                   or 'transparency' in image.info)
+    image = image.convert('RGBA' if transparent else 'RGB')
+    buffer = BytesIO()
+    if transparent:
+        image.save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue(), 'png'
+    image.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+    return buffer.getvalue(), 'jpg'
+
+
+def normalize_image(post):
+    """Перекодировать картинку, если она велика или не в веб-формате."""
+    with post.image.open('rb'):
+        image = Image.open(post.image)
+        if (image.format in settings.POSTS_IMAGE_FORMATS
+                and max(image.size) <= settings.POSTS_IMAGE_MAX_SIDE):
+            return
+        content, extension = _encode(image)
+    storage = post.image.storage
+    old_name = post.image.name
+    new_name = storage.save(
+        f'{os.path.splitext(old_name)[0]}.{extension}',
+        ContentFile(content),
+    )
+    updated = Post.objects.filter(pk=post.pk, image=old_name).update(
+        image=new_name, updated=timezone.now())
+    if not updated:
+        storage.delete(new_name)
+        return
+    storage.delete(old_name)
+    post.image.name = new_name
+    cache.bump_version()
+
+
+@task
+def generate_thumbnails(post_id):
+    """Обработать картинку поста и сохранить URL её миниатюр."""
+    post = Post.objects.only('image').filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    normalize_image(post)
+    urls = {
+        name: get_thumbnail(post.image, geometry, **options).url
+        for name, (geometry, options) in settings.POSTS_THUMBNAILS.items()
+    }
+    # Картинку могли заменить, пока шла нарезка: тогда URL не подходят.
+    # Новое время изменения сбрасывает карточку и ETag поста, новая
+    # версия — кэш страниц, иначе там до конца срока осталась бы ленивая
+    # нарезка.
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnails=json.dumps(urls), updated=timezone.now())
+    if updated:
+        cache.bump_version()
+
+
+def schedule_thumbnails(post):
+    """Поставить обработку картинки в очередь фоновых задач."""
+    if post.image:
+        enqueue(generate_thumbnails, post.pk, key=f'thumbnails:{post.pk}')
@@ -0,0 +1,284 @@
+"""Потоковый экспорт и импорт контента в NDJSON.
+
+Файл — по строке JSON на объект с полем `model`: сначала пользователи,
+затем группы, посты, комментарии, архивные посты и комментарии
+(posts/archive.py) и подписки, чтобы внешние ключи ссылались на уже
+загруженное. Экспорт читает таблицы итератором
+по `chunk_size` строк, импорт пишет пачками через `bulk_create`,
+поэтому память не растёт с размером данных.
+
+Импорт выдаёт объектам новые id, а соответствие старых и новых хранит
+в `ImportedObject`: по нему переставляются внешние ключи, и повторный
+запуск после обрыва пропускает уже загруженные пачки. Пользователи и
+группы с тем же именем или slug не создаются заново, а сопоставляются
+с существующими. Картинки постов не переносятся, только пути к ним.
+Архивные посты загружаются в Post, чтобы получить id из его
+последовательности, и в конце загрузки переносятся в архив.
+`bulk_create` не шлёт сигналов, поэтому счётчики, ленты и поиск после
+импорта пересчитываются целиком (`rebuild_derived`).
+"""
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import archive, cache, counters, search
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                     ImportedObject, Post, User)
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'updated', 'author_id',
+               'group_id', 'image')
+COMMENT_FIELDS = ('id', 'post_id', 'author_id', 'text', 'created')
+
+# Модель файла -> (модель, выгружаемые поля) в порядке выгрузки.
+EXPORT_FIELDS = {
+    'user': (User, ('id', 'username', 'first_name', 'last_name', 'email',
+                    'password', 'is_active', 'date_joined')),
+    'group': (Group, ('id', 'title', 'slug', 'description')),
+    'post': (Post, POST_FIELDS),
+    'comment': (Comment, COMMENT_FIELDS),
+    'archived_post': (ArchivedPost, POST_FIELDS),
+    'archived_comment': (ArchivedComment, COMMENT_FIELDS),
+    'follow': (Follow, ('user_id', 'author_id')),
+}
+# Таблицы, с которыми модель делит id (см. posts/archive.py).
+ARCHIVES = {Post: (ArchivedPost,), Comment: (ArchivedComment,)}
+
+
+class _Encoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder обрезает время до миллисекунд, а курсоры
+        # страниц сравнивают даты точно.
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Дать задать даты с auto_now и auto_now_add вручную."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Progress:
+    """Число строк по моделям и скорость в строках в секунду."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counts = defaultdict(int)
+        self.skipped = defaultdict(int)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.total / elapsed if elapsed else 0.0
+
+
+def export(stream, chunk_size=2000, on_chunk=None):
+    """Записать все объекты в stream; вернуть Progress."""
+    progress = Progress()
+    for name, (model, fields) in EXPORT_FIELDS.items():
+        rows = model.objects.order_by('pk').values(*fields)
+        for row in rows.iterator(chunk_size=chunk_size):
+            stream.write(json.dumps({'model': name, **row},
+                                    cls=_Encoder,
+                                    ensure_ascii=False))
+            stream.write('\n')
+            progress.counts[name] += 1
+            if on_chunk and progress.counts[name] % chunk_size == 0:
+                on_chunk(progress)
+    return progress
+
+
+def _insert(model, objects):
+    """bulk_create, возвращающий id новых строк."""
+    if not connection.features.can_return_ids_from_bulk_insert:
+        # SQLite не возвращает id: назначаем их сами. Транзакция уже
+        # держит блокировку записи, так что max(id) никто не обгонит.
+        last = max(
+            table.objects.aggregate(last=Max('pk'))['last'] or 0
+            for table in (model, *ARCHIVES.get(model, ()))
+        )
+        for number, obj in enumerate(objects, last + 1):
+            obj.pk = number
+    model.objects.bulk_create(objects)
+    return [obj.pk for obj in objects]
+
+
+class Importer:
+    """Загрузка строк NDJSON пачками по `batch_size`."""
+
+    def __init__(self, source, batch_size=1000, on_batch=None):
+        self.source = source
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.progress = Progress()
+
+    def run(self, lines):
+        name, batch = None, []
+        for line in lines:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            row_name = row.pop('model')
+            if row_name not in EXPORT_FIELDS:
+                raise ValueError(f'Неизвестная модель: {row_name}')
+            if row_name != name or len(batch) >= self.batch_size:
+                self.flush(name, batch)
+                name, batch = row_name, []
+            batch.append(row)
+        self.flush(name, batch)
+        self.archive_imported()
+        return self.progress
+
+    def flush(self, name, rows):
+        if not rows:
+            return
+        with transaction.atomic():
+            getattr(self, f'import_{name}')(rows)
+        if self.on_batch:
+            self.on_batch(self.progress)
+
+    def mapped(self, name, old_ids):
+        return dict(ImportedObject.objects.filter(
+            source=self.source, model=name, old_id__in=set(old_ids),
+        ).values_list('old_id', 'new_id'))
+
+    def remember(self, name, old_ids, new_ids):
+        ImportedObject.objects.bulk_create(
+            ImportedObject(source=self.source, model=name, old_id=old,
+                           new_id=new)
+            for old, new in zip(old_ids, new_ids)
+        )
+
+    def pending(self, name, rows):
+        """Строки пачки, которые ещё не загружались."""
+        done = self.mapped(name, (row['id'] for row in rows))
+        self.progress.skipped[name] += len(done)
+        return [row for row in rows if row['id'] not in done]
+
+    def _match_existing(self, name, model, field, rows):
+        """Сопоставить строки с объектами с тем же уникальным полем."""
+        rows = self.pending(name, rows)
+        existing = dict(model.objects.filter(
+            **{f'{field}__in': [row[field] for row in rows]},
+        ).values_list(field, 'pk'))
+        matched = [row for row in rows if row[field] in existing]
+        self.remember(name, [row['id'] for row in matched],
+                      [existing[row[field]] for row in matched])
+        new = [row for row in rows if row[field] not in existing]
+        objects = [model(**{key: value for key, value in row.items()
+                            if key != 'id'}) for row in new]
+        self.remember(name, [row['id'] for row in new],
+                      _insert(model, objects))
+        self.progress.counts[name] += len(rows)
+
+    def import_user(self, rows):
+        self._match_existing('user', User, 'username', rows)
+
+    def import_group(self, rows):
+        self._match_existing('group', Group, 'slug', rows)
+
+    def _remap(self, name, rows, **references):
+        """Переставить внешние ключи; строки без ссылки отбрасываются."""
+        maps = {
+            field: self.mapped(model, (row[field] for row in rows
+                                       if row[field] is not None))
+            for field, model in references.items()
+        }
+        result = []
+        for row in rows:
+            try:
+                for field, mapping in maps.items():
+                    if row[field] is not None:
+                        row[field] = mapping[row[field]]
+            except KeyError:
+                self.progress.skipped[name] += 1
+                continue
+            result.append(row)
+        return result
+
+    def _import_rows(self, name, model, date_fields, rows, **references):
+        rows = self._remap(name, self.pending(name, rows), **references)
+        fields = [model._meta.get_field(field) for field in date_fields]
+        with manual_dates(*fields):
+            objects = [model(**{key: value for key, value in row.items()
+                                if key != 'id'}) for row in rows]
+            new_ids = _insert(model, objects)
+        self.remember(name, [row['id'] for row in rows], new_ids)
+        self.progress.counts[name] += len(rows)
+
+    def import_post(self, rows):
+        self._import_rows('post', Post, ('pub_date', 'updated'), rows,
+                          author_id='user', group_id='group')
+
+    def import_comment(self, rows):
+        self._import_rows('comment', Comment, ('created',), rows,
+                          post_id='post', author_id='user')
+
+    def import_archived_post(self, rows):
+        self._import_rows('archived_post', Post, ('pub_date', 'updated'),
+                          rows, author_id='user', group_id='group')
+
+    def import_archived_comment(self, rows):
+        self._import_rows('archived_comment', Comment, ('created',), rows,
+                          post_id='archived_post', author_id='user')
+
+    def archive_imported(self):
+        """Перенести в архив загруженные архивные посты.
+
+        Пока они в Post, повторная загрузка после обрыва их тоже
+        перенесёт.
+        """
+        new_ids = ImportedObject.objects.filter(
+            source=self.source, model='archived_post',
+        ).order_by('pk').values_list('new_id', flat=True)
+        batch = []
+        for post_id in new_ids.iterator(chunk_size=self.batch_size):
+            batch.append(post_id)
+            if len(batch) >= self.batch_size:
+                self._archive(batch)
+                batch = []
+        self._archive(batch)
+
+    @staticmethod
+    def _archive(post_ids):
+        post_ids = list(Post.objects.filter(
+            pk__in=post_ids).values_list('pk', flat=True))
+        if post_ids:
+            archive.archive_batch(post_ids)
+
+    def import_follow(self, rows):
+        # Подписки уникальны, поэтому повтор просто пропускается.
+        rows = self._remap('follow', rows, user_id='user',
+                           author_id='user')
+        Follow.objects.bulk_create(
+            [Follow(**row) for row in rows], ignore_conflicts=True)
+        self.progress.counts['follow'] += len(rows)
+
+
+def rebuild_derived():
+    """Пересчитать счётчики, ленты и поиск после массовой загрузки."""
+    counters.recount_authors()
+    counters.recount_groups()
+    counters.recount_posts()
+    call_command('backfill_feed', clear=True, stdout=StringIO())
+    search.rebuild()
+    cache.bump_version()
@@ -0,0 +1,72 @@
+"""Потоковая проверка загружаемых картинок.
+
+Обработчик пишет файл на диск по частям, как TemporaryFileUploadHandler,
+и по ходу загрузки проверяет объём и размеры картинки из заголовка.
+Слишком большой файл или «декомпрессионная бомба» отбрасываются до того,
+как Pillow начнёт декодировать пиксели, а причина попадает в ошибки
+PostForm.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+# Заголовки JPEG с EXIF и PNG с метаданными помещаются в эти байты.
+HEADER_BYTES = 64 * 1024
+
+
+class RejectedUpload(UploadedFile):
+    """Загрузка, отброшенная обработчиком; причина в `upload_error`."""
+
+    def __init__(self, name, error):
+        super().__init__(BytesIO(), name=name, size=0)
+        self.upload_error = error
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+        self.header_checked = False
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.POSTS_IMAGE_MAX_BYTES:
+            self.error = (
+                'Файл больше '
+                f'{filesizeformat(settings.POSTS_IMAGE_MAX_BYTES)}'
+            )
+            return None
+        if not self.header_checked:
+            self.header += raw_data[:HEADER_BYTES - len(self.header)]
+            self.check_header()
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self):
+        """Прочитать размеры картинки из заголовка, не декодируя её."""
+        try:
+            width, height = Image.open(BytesIO(self.header)).size
+        except Image.DecompressionBombError:
+            width = height = None
+        except Exception:
+            # Заголовок ещё не дочитан или это не картинка: решение
+            # примет ImageField, когда файл загрузится целиком.
+            self.header_checked = len(self.header) >= HEADER_BYTES
+            return
+        self.header_checked = True
+        if width is None or width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+            self.error = 'Слишком большое разрешение картинки'
+
+    def file_complete(self, file_size):
+        if self.error:
+            self.file.close()
+            return RejectedUpload(self.file_name, self.error)
+        return super().file_complete(file_size)
@@ -1,34 +1,66 @@
 from django.shortcuts import render, get_object_or_404
-from .models import Follow, Post, Group, User
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Post,
+                     Group, User)
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import condition
+from core.ratelimit import rate_limit
+from . import conditional
+from .cache import cached_cursor_page
+from .counters import get_stats
+from .feed import get_feed
 from .forms import PostForm, CommentForm
+from .paginators import CursorPaginator, MergedCursorPaginator
+from .search import SearchResults
+from .thumbnails import schedule_thumbnails
 from django.shortcuts import redirect
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
 
 AMOUNT = 10
+COMMENTS_AMOUNT = 20
 
 
-def paginator(request, objects):
-    paginator = Paginator(objects, AMOUNT)
+def paginator(request, objects, cursor=False, cache_scope=None,
+              archived=None):
+    """Страница списка объектов.
+
+    С `cursor=True` страницы листаются курсорами `?after=`/`?before=`
+    без `COUNT(*)` и `OFFSET`; ссылки вида `?page=N` продолжают работать.
+    Курсорные страницы с `cache_scope` берутся из кэша страниц постов.
+    `archived` — те же посты из архива, они листаются вместе с objects.
+    """
     page_number = request.GET.get('page')
+    if cursor and page_number is None:
+        if archived is None:
+            pager = CursorPaginator(objects, AMOUNT)
+        else:
+            pager = MergedCursorPaginator([objects, archived], AMOUNT)
+        after = request.GET.get('after')
+        before = request.GET.get('before')
+        if cache_scope:
+            return cached_cursor_page(cache_scope, pager, after, before)
+        return pager.get_page(after=after, before=before)
+    paginator = Paginator(objects, AMOUNT)
     return paginator.get_page(page_number)
 
 
-@cache_page(20, key_prefix="index_page")
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = paginator(request, post_list)
+    post_list = Post.objects.for_list()
+    page_obj = paginator(request, post_list, cursor=True,
+                         cache_scope='index')
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=conditional.group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator(request, posts)
+    posts = group.posts.for_list()
+    page_obj = paginator(request, posts, cursor=True,
+                         cache_scope=f'group:{group.pk}',
+                         archived=group.archived_posts.for_list())
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -36,34 +68,71 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=conditional.profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator(request, posts)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    posts = author.posts.for_list()
+    page_obj = paginator(request, posts, cursor=True,
+                         cache_scope=f'profile:{author.pk}',
+                         archived=author.archived_posts.for_list())
     following = (
         request.user.is_authenticated
         and Follow.objects.filter(user=request.user, author=author).exists()
     )
     context = {
         'author': author,
+        'stats': get_stats(author),
         'page_obj': page_obj,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=conditional.post_detail_etag,
+           last_modified_func=conditional.post_detail_last_modified)
 def post_detail(request, post_id):
     form = CommentForm()
-    post = get_object_or_404(Post, pk=post_id)
+    post = Post.objects.select_related('author__stats', 'group').filter(
+        pk=post_id).first()
+    archived = post is None
+    if archived:
+        post = get_object_or_404(
+            ArchivedPost.objects.select_related('author__stats', 'group'),
+            pk=post_id,
+        )
     context = {
         'post': post,
+        'archived': archived,
+        'stats': get_stats(post.author),
         'form': form,
-        'comments': post.comments.all()
+        'comments': comments_page(post.pk, archived=archived),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(post_id, after=None, archived=False):
+    """Страница комментариев поста от старых к новым вместе с авторами."""
+    model = ArchivedComment if archived else Comment
+    comments = model.objects.filter(post_id=post_id).select_related(
+        'author').only('text', 'created', 'post', 'author__username')
+    pager = CursorPaginator(comments, COMMENTS_AMOUNT)
+    return pager.get_page(after=after)
+
+
+def post_comments(request, post_id):
+    """Следующая страница комментариев фрагментом HTML для post_detail."""
+    archived = ArchivedPost.objects.filter(pk=post_id).exists()
+    context = {
+        'post_id': post_id,
+        'comments': comments_page(post_id, request.GET.get('after'),
+                                  archived),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
+@rate_limit('post_create', methods=('POST',))
 def post_create(request):
     if request.method == "POST":
         form = PostForm(request.POST,
@@ -73,6 +142,7 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            schedule_thumbnails(post)
             return redirect('posts:profile', request.user)
         return render(request, 'posts/create_post.html', {'form': form})
     form = PostForm()
@@ -94,6 +164,8 @@ def post_edit(request, post_id):
 
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post)
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -104,6 +176,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@rate_limit('add_comment', methods=('POST',))
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -115,30 +188,39 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def search(request):
+    """Посты, содержащие все слова запроса `q`, от самых подходящих."""
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page_obj': paginator(request, SearchResults(query)),
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def follow_index(request):
     """View-функция страницы, куда будут выведены посты авторов,
     на которых подписан текущий пользователь"""
-    posts = Post.objects.filter(author__following__user=request.user)
-    count = Follow.objects.count()
+    posts = get_feed(request.user).for_list()
     context = dict(posts=posts,
-                   count=count,
-                   page_obj=paginator(request, posts))
+                   page_obj=paginator(request, posts, cursor=True))
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@rate_limit('follow')
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
-    if user != author and Follow.objects.filter(user=user,
-                                                author=author
-                                                ).exists() is False:
-        Follow.objects.create(user=user, author=author)
+    if user != author:
+        Follow.objects.get_or_create(user=user, author=author)
     return redirect('posts:follow_index')
 
 
 @login_required
+@rate_limit('follow')
 def profile_unfollow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
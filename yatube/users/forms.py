@@ -1,6 +1,9 @@
-from django.contrib.auth.forms import UserCreationForm
+from django import forms
+from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth import get_user_model
 
+from . import guard
+
 
 User = get_user_model()
 
@@ -9,3 +12,36 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class GuardedAuthenticationForm(AuthenticationForm):
+    """Вход с ограничением попыток и числа одновременных хэширований."""
+
+    error_messages = {
+        **AuthenticationForm.error_messages,
+        'throttled': 'Слишком много неудачных попыток входа. '
+                     'Повторите через %(seconds)s с.',
+        'busy': 'Сервер занят, повторите попытку через секунду.',
+    }
+
+    def clean(self):
+        username = self.cleaned_data.get('username') or ''
+        ip = self.request.META.get('REMOTE_ADDR') if self.request else None
+        self.retry_after = guard.retry_after(username, ip)
+        if self.retry_after:
+            raise forms.ValidationError(
+                self.error_messages['throttled'], code='throttled',
+                params={'seconds': self.retry_after})
+        try:
+            with guard.hashing_slot():
+                cleaned_data = super().clean()
+        except guard.Busy:
+            self.retry_after = 1
+            raise forms.ValidationError(self.error_messages['busy'],
+                                        code='busy')
+        except forms.ValidationError as error:
+            if error.code == 'invalid_login':
+                guard.record_failure(username, ip)
+            raise
+        guard.forget(username)
+        return cleaned_data
@@ -0,0 +1,88 @@
+"""Защита входа от перебора паролей.
+
+Проверка пароля (PBKDF2) — самая дорогая операция сайта, и поток
+неудачных входов может занять ею все процессоры. Поэтому:
+
+* неудачные попытки считаются в кэше отдельно по имени пользователя и
+  по IP; после `LOGIN_FREE_ATTEMPTS` попыток каждая следующая
+  запрещает вход на время, которое удваивается от `LOGIN_BACKOFF_BASE`
+  до `LOGIN_BACKOFF_MAX` секунд. Запрет проверяется одним `get_many`
+  до хэширования;
+* хэшировать одновременно могут не больше `LOGIN_HASH_CONCURRENCY`
+  потоков процесса; кто не дождался места за `LOGIN_HASH_WAIT` секунд,
+  получает отказ без хэширования.
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+_semaphores = {}
+_semaphores_lock = threading.Lock()
+
+
+class Busy(Exception):
+    pass
+
+
+def _keys(username, ip):
+    digest = hashlib.md5(username.strip().lower().encode()).hexdigest()
+    return {'user': f'login:user:{digest}', 'ip': f'login:ip:{ip}'}
+
+
+def backoff(failures, free):
+    """Сколько секунд запрещён вход после `failures` неудач."""
+    if failures <= free:
+        return 0
+    return min(settings.LOGIN_BACKOFF_BASE * 2 ** (failures - free - 1),
+               settings.LOGIN_BACKOFF_MAX)
+
+
+def retry_after(username, ip, now=None):
+    """0, если вход разрешён, иначе через сколько секунд повторить."""
+    now = time.time() if now is None else now
+    keys = [f'{key}:until' for key in _keys(username, ip).values()]
+    until = max(cache.get_many(keys).values(), default=0)
+    return max(int(until - now + 0.999), 0)
+
+
+def record_failure(username, ip, now=None):
+    now = time.time() if now is None else now
+    window = settings.LOGIN_FAILURE_WINDOW
+    for scope, key in _keys(username, ip).items():
+        if cache.add(key, 1, window):
+            failures = 1
+        else:
+            failures = cache.incr(key)
+        delay = backoff(failures, settings.LOGIN_FREE_ATTEMPTS[scope])
+        if delay:
+            cache.set(f'{key}:until', now + delay, delay)
+
+
+def forget(username):
+    """Сбросить счётчик пользователя после успешного входа."""
+    key = _keys(username, None)['user']
+    cache.delete_many([key, f'{key}:until'])
+
+
+def _semaphore():
+    size = settings.LOGIN_HASH_CONCURRENCY
+    with _semaphores_lock:
+        if size not in _semaphores:
+            _semaphores[size] = threading.BoundedSemaphore(size)
+        return _semaphores[size]
+
+
+@contextmanager
+def hashing_slot():
+    """Место в пуле хэширования; Busy, если его не дали вовремя."""
+    semaphore = _semaphore()
+    if not semaphore.acquire(timeout=settings.LOGIN_HASH_WAIT):
+        raise Busy
+    try:
+        yield
+    finally:
+        semaphore.release()
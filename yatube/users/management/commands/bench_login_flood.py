@@ -0,0 +1,114 @@
+import logging
+import random
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+from django.urls import reverse
+
+from core.profiling import percentile
+
+# Настройки каждой фазы прогона; None — без перебора паролей.
+PHASES = {
+    'без перебора': None,
+    'перебор без защиты': {
+        'LOGIN_FREE_ATTEMPTS': {'user': 10 ** 9, 'ip': 10 ** 9},
+        'LOGIN_HASH_CONCURRENCY': 10 ** 6,
+    },
+    'перебор с защитой': {},
+}
+
+# Свой кэш в памяти процесса: cache.clear() перед фазой не должен
+# стирать сессии, лимиты и счётчики входа из общего кэша сервера.
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench-login-flood',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = ('Меряет время ответа главной страницы, пока другие потоки '
+            'перебирают пароли, без защиты входа и с ней')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--attackers', type=int, default=8)
+
+    def handle(self, *args, **options):
+        # Отказы 503 под перебором ожидаемы, их не нужно печатать.
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True)
+        try:
+            for name, overrides in PHASES.items():
+                with override_settings(CACHES=BENCH_CACHES,
+                                       **(overrides or {})):
+                    cache.clear()
+                    reads, logins = self.run_phase(
+                        options['seconds'],
+                        options['attackers'] if overrides is not None
+                        else 0,
+                    )
+                self.stdout.write(
+                    f'{name}: главная p50 {percentile(reads, 50):.1f} мс, '
+                    f'p95 {percentile(reads, 95):.1f} мс, '
+                    f'{len(reads)} запросов; попыток входа {len(logins)}, '
+                    f'отказов {sum(code != 200 for code in logins)}')
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def run_phase(self, seconds, attackers):
+        stop = threading.Event()
+        reads, logins = [], []
+        threads = [threading.Thread(target=self.read, args=(stop, reads))]
+        threads += [
+            threading.Thread(target=self.attack, args=(stop, logins))
+            for _ in range(attackers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return reads, logins
+
+    @staticmethod
+    def read(stop, timings):
+        client = Client()
+        url = reverse('posts:index')
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def attack(stop, statuses):
+        client = Client()
+        url = reverse('users:login')
+        rng = random.Random()
+        try:
+            while not stop.is_set():
+                # Разные имена и адреса, как у ботнета.
+                response = client.post(
+                    url,
+                    {'username': f'victim-{rng.randrange(100)}',
+                     'password': 'wrong-password'},
+                    REMOTE_ADDR=f'10.0.{rng.randrange(256)}.'
+                                f'{rng.randrange(256)}',
+                )
+                statuses.append(response.status_code)
+        finally:
+            connection.close()
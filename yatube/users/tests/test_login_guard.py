@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import guard
+
+User = get_user_model()
+
+
+@override_settings(LOGIN_FREE_ATTEMPTS={'user': 2, 'ip': 100},
+                   LOGIN_BACKOFF_BASE=10, LOGIN_HASH_WAIT=0)
+class LoginGuardTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='user', password='password')
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, password, username='user', ip='10.0.0.1'):
+        return self.client.post(
+            reverse('users:login'),
+            {'username': username, 'password': password},
+            REMOTE_ADDR=ip,
+        )
+
+    def test_backoff_before_hashing(self):
+        """После лимита неудач пароль даже не проверяется."""
+        for _ in range(3):
+            self.assertEqual(self.login('wrong').status_code, 200)
+        with mock.patch('django.contrib.auth.forms.authenticate') as check:
+            response = self.login('password', ip='10.0.0.2')
+        check.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')
+
+    def test_success_resets_counter(self):
+        self.login('wrong')
+        self.login('wrong')
+        self.assertRedirects(self.login('password'), reverse('posts:index'),
+                             fetch_redirect_response=False)
+        self.client.logout()
+        self.login('wrong')
+        self.assertEqual(self.login('wrong').status_code, 200)
+
+    @override_settings(LOGIN_FREE_ATTEMPTS={'user': 100, 'ip': 1})
+    def test_ip_is_limited_across_usernames(self):
+        self.login('wrong', username='a')
+        self.login('wrong', username='b')
+        self.assertEqual(self.login('password').status_code, 429)
+
+    @override_settings(LOGIN_HASH_CONCURRENCY=1)
+    def test_busy_pool_refuses_without_hashing(self):
+        with guard.hashing_slot():
+            response = self.login('password')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_backoff_doubles_up_to_max(self):
+        with self.settings(LOGIN_BACKOFF_MAX=30):
+            self.assertEqual(
+                [guard.backoff(n, 2) for n in range(1, 7)],
+                [0, 0, 10, 20, 30, 30])
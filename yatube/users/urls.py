@@ -1,4 +1,4 @@
-from django.contrib.auth.views import LoginView, LogoutView
+from django.contrib.auth.views import LogoutView
 from django.urls import path
 from . import views
 
@@ -13,7 +13,7 @@ urlpatterns = [
     path('signup/', views.SignUp.as_view(), name='signup'),
     path(
         'login/',
-        LoginView.as_view(template_name='users/login.html'),
+        views.LoginView.as_view(),
         name='login'
     ),
 ]
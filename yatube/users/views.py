@@ -1,9 +1,24 @@
+from django.contrib.auth import views as auth_views
+from django.forms.forms import NON_FIELD_ERRORS
 from django.views.generic import CreateView
 from django.urls import reverse_lazy
-from .forms import CreationForm
+from .forms import CreationForm, GuardedAuthenticationForm
 
 
 class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
+
+
+class LoginView(auth_views.LoginView):
+    form_class = GuardedAuthenticationForm
+    template_name = 'users/login.html'
+
+    def form_invalid(self, form):
+        response = super().form_invalid(form)
+        for code, status in (('throttled', 429), ('busy', 503)):
+            if form.has_error(NON_FIELD_ERRORS, code):
+                response.status_code = status
+                response['Retry-After'] = str(form.retry_after)
+        return response
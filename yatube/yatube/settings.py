@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'about.apps.AboutConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
+    'core.db.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,19 +80,82 @@ TEMPLATES = [
     },
 ]
 
+# Разобрать все шаблоны при запуске процесса (см. core/template_cache.py).
+# Имеет смысл только с кэширующим загрузчиком, как в settings_production.
+TEMPLATES_WARM_UP = False
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Бэкенд core.db.backends.sqlite3 применяет PRAGMA при подключении и
+# выстраивает транзакции записи процесса в очередь (см. его описание).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'memory',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'pragmas': SQLITE_PRAGMAS,
+            'serialize_writes': True,
+        },
+        # Тестовая база в файле: у SQLite в памяти нет WAL, а потоки
+        # блокируют друг другу таблицы целиком.
+        'TEST': {
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 
+# Реплики только для чтения: пути к копиям базы через запятую
+# в YATUBE_DB_REPLICAS. Локально их обновляет `manage.py sync_replicas`.
+# GET-запросы читают с реплик, запись и чтение в течение
+# REPLICA_PIN_SECONDS после неё идут в основную базу
+# (см. core/db/routers.py).
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 5
+
+
+# Сессии читаются из кэша и пишутся в базу и кэш; сохраняются, только
+# если изменились. Пользователь запроса тоже берётся из кэша
+# (см. core/auth.py), так что обычный GET не ходит в django_session и
+# auth_user.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['core.auth.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = 5 * 60
+
+# Защита входа (см. users/guard.py): бесплатные неудачные попытки по
+# имени и по IP, затем запрет на удваивающееся время; счётчики живут
+# LOGIN_FAILURE_WINDOW секунд. Пароли одновременно хэшируют не больше
+# LOGIN_HASH_CONCURRENCY потоков процесса: половина ядер остаётся
+# остальным запросам.
+LOGIN_FREE_ATTEMPTS = {'user': 5, 'ip': 50}
+LOGIN_BACKOFF_BASE = 1
+LOGIN_BACKOFF_MAX = 15 * 60
+LOGIN_FAILURE_WINDOW = 60 * 60
+LOGIN_HASH_CONCURRENCY = max((os.cpu_count() or 2) // 2, 1)
+LOGIN_HASH_WAIT = 0.5
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -129,6 +195,8 @@ USE_TZ = True
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
 STATIC_URL = '/static/'
+# Сюда collectstatic собирает статику для боевого сервера.
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_root')
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -140,8 +208,78 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки пишутся на диск по частям и проверяются по ходу загрузки
+# (см. posts/uploads.py).
+FILE_UPLOAD_HANDLERS = ['posts.uploads.BoundedImageUploadHandler']
+POSTS_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POSTS_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+# Картинки больше этой стороны или в других форматах перекодируются
+# в фоне вместе с нарезкой миниатюр.
+POSTS_IMAGE_MAX_SIDE = 2560
+POSTS_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF')
+
+# Профилирование: доля запросов с замерами SQL, кэша и шаблонов
+# (0 — только по ?_profile от сотрудников) и размер скользящей сводки
+# на представление, которую показывает /admin/profiling/.
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_WINDOW = 500
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Лента подписок: авторы, у которых подписчиков больше FEED_FANOUT_LIMIT,
+# не раскладываются по лентам при публикации, а читаются на лету, пока
+# подписчиков снова не станет не больше FEED_FANOUT_RESUME.
+FEED_FANOUT_LIMIT = 10000
+FEED_FANOUT_RESUME = 9000
+FEED_BACKFILL_LIMIT = 1000
+FEED_BATCH_SIZE = 500
+
+# Страницы со списками постов хранятся в кэше, пока не изменится версия
+# (см. posts/cache.py), поэтому время жизни может быть большим.
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+POSTS_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Посты старше стольких дней команда archive_posts переносит в архивные
+# таблицы (см. posts/archive.py).
+POSTS_ARCHIVE_AFTER_DAYS = 365
+
+# Размеры миниатюр, которые режутся заранее после загрузки картинки:
+# имя -> (геометрия, опции sorl-thumbnail). Должны совпадать с теми,
+# что запрашивают шаблоны карточки и страницы поста.
+POSTS_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+    'detail': ('960x339', {'crop': '', 'upscale': True}),
+}
+
+# Лимиты запросов на пользователя и на IP: 'N/период', период s, m, h
+# или d. С одного IP могут заходить несколько пользователей, поэтому
+# его лимиты выше. Сверх лимита — ответ 429 (см. core/ratelimit.py).
+RATE_LIMITS = {
+    'post_create': '10/m',
+    'add_comment': '20/m',
+    'follow': '60/m',
+}
+RATE_LIMITS_IP = {
+    'post_create': '30/m',
+    'add_comment': '60/m',
+    'follow': '180/m',
+}
+RATE_LIMIT_CACHE = 'default'
+
+# Очередь фоновых задач (см. core/jobs.py): раскладка постов по лентам,
+# поисковый индекс и миниатюры. Задачи выполняет `manage.py run_worker`
+# из JOBS_WORKERS процессов; при JOBS_EAGER (режим разработки) — сразу
+# в процессе запроса. Задержка повтора удваивается с каждой попыткой,
+# глубину очереди и задержки задач показывает /admin/profiling/.
+JOBS_EAGER = DEBUG
+JOBS_WORKERS = 2
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 10
+JOBS_TIMEOUT = 10 * 60
+JOBS_POLL_INTERVAL = 1
+JOBS_KEEP_DONE = 24 * 60 * 60
+JOBS_STATS_WINDOW = 60 * 60
@@ -0,0 +1,55 @@
+"""Настройки боевого сервера поверх yatube/settings.py.
+
+Включаются через DJANGO_SETTINGS_MODULE=yatube.settings_production.
+"""
+import os
+
+from .settings import *  # noqa: F401, F403
+from .settings import MIDDLEWARE, TEMPLATES
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.getenv(
+    'YATUBE_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+
+# Шаблоны читаются с диска и разбираются один раз на процесс, причём
+# сразу при запуске; правки шаблонов видны только после перезапуска.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+TEMPLATES_WARM_UP = True
+
+# Статика собирается командой collectstatic: имена с хэшем содержимого
+# и сжатые копии .gz/.br. Её отдаёт само приложение с годовым
+# кэшированием (см. core/staticfiles.py).
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+_security = MIDDLEWARE.index('django.middleware.security.SecurityMiddleware')
+MIDDLEWARE = [
+    *MIDDLEWARE[:_security + 1],
+    'core.staticfiles.StaticFilesMiddleware',
+    *MIDDLEWARE[_security + 1:],
+]
+
+# Кэш общий для всех процессов: в нём пользователи запросов
+# (core/auth.py), сессии, счётчики лимитов и входа. С кэшем в памяти
+# процесса сохранение пользователя в одном процессе не сбросило бы его
+# копию в других.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.getenv('YATUBE_MEMCACHED', '127.0.0.1:11211'),
+    }
+}
+
+# Задачи выполняет manage.py run_worker.
+JOBS_EAGER = False